@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare dedup memory and lookup time: string sets vs DigestSet."""
+
+import argparse
+import gc
+import hashlib
+import random
+import time
+import tracemalloc
+
+from ingestion.pipeline.digests import DigestSet, hash_key, url_key
+
+
+def make_keys(n: int) -> tuple[list[str], list[str]]:
+    hashes = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(n)]
+    urls = [f"https://blog.example.com/{i // 1000}/posts/article-{i}.html" for i in range(n)]
+    return hashes, urls
+
+
+def measure(label: str, build) -> object:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<24} build {elapsed:6.2f}s   held {current / 2**20:7.1f} MiB   peak {peak / 2**20:7.1f} MiB")
+    return result
+
+
+def time_lookups(label: str, contains, probes: list) -> None:
+    start = time.perf_counter()
+    found = sum(1 for p in probes if contains(p))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {len(probes)} lookups {elapsed:6.2f}s   "
+          f"{elapsed / len(probes) * 1e9:6.0f} ns/lookup   ({found} hits)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1_000_000, help="entries per set")
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"Generating {args.n} hashes and URLs...")
+    hashes, urls = make_keys(args.n)
+    rng = random.Random(0)
+    # Half hits, half misses.
+    probe_hashes = rng.sample(hashes, args.lookups // 2) + [
+        hashlib.sha256(f"miss{i}".encode()).hexdigest() for i in range(args.lookups // 2)
+    ]
+    probe_urls = rng.sample(urls, args.lookups // 2) + [
+        f"https://other.example.org/{i}" for i in range(args.lookups // 2)
+    ]
+
+    print("\n-- memory (strings pre-allocated; build times include tracemalloc overhead) --")
+    str_hashes = measure("set[str] hashes", lambda: set(hashes))
+    str_urls = measure("set[str] urls", lambda: set(urls))
+    dig_hashes = measure("DigestSet hashes", lambda: DigestSet(hash_key(h) for h in hashes))
+    dig_urls = measure("DigestSet urls", lambda: DigestSet(url_key(u) for u in urls))
+
+    # The string sets also keep the strings alive; count them too.
+    per_str = sum(len(h) + 49 for h in hashes[:1000]) / 1000
+    per_url = sum(len(u) + 49 for u in urls[:1000]) / 1000
+    print(f"{'(+ string objects)':<24} hashes ~{per_str * args.n / 2**20:.1f} MiB, urls ~{per_url * args.n / 2**20:.1f} MiB")
+
+    print("\n-- lookups (including key derivation) --")
+    time_lookups("set[str] hashes", str_hashes.__contains__, probe_hashes)
+    time_lookups("set[str] urls", str_urls.__contains__, probe_urls)
+    time_lookups("DigestSet hashes", lambda h: hash_key(h) in dig_hashes, probe_hashes)
+    time_lookups("DigestSet urls", lambda u: url_key(u) in dig_urls, probe_urls)
+
+    print("\n-- incremental adds (10k into the full set) --")
+    start = time.perf_counter()
+    for i in range(10_000):
+        dig_hashes.add(hash_key(hashlib.sha256(f"new{i}".encode()).hexdigest()))
+    print(f"{'DigestSet.add':<24} {(time.perf_counter() - start) / 10_000 * 1e6:6.1f} us/add")
+
+
+if __name__ == "__main__":
+    main()
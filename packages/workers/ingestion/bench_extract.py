@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Compare per-page crawler CPU time: BeautifulSoup + re-serialise vs one lxml parse."""
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+import trafilatura
+from bs4 import BeautifulSoup
+
+from ingestion.adapters.extraction import parse_page
+
+WORDS = (
+    "the of and to in a is that for it as was with be by on not he this are or his from at "
+    "which but have an they you were her she there been one all we their has would when if "
+    "so no will more about can what out up them some time only other new could into two may"
+).split()
+
+
+def make_page(i: int, rng: random.Random, words: int) -> bytes:
+    """A blog post with navigation, a sidebar of links and a long article."""
+    nav = "".join(f'<li><a href="/category/{c}/">Category {c}</a></li>' for c in range(20))
+    sidebar = "".join(
+        f'<li><a href="/posts/{rng.randrange(10_000)}.html">Related post {j}</a></li>'
+        for j in range(60)
+    )
+    paragraphs = []
+    remaining = words
+    while remaining > 0:
+        n = min(remaining, rng.randint(40, 120))
+        text = " ".join(rng.choice(WORDS) for _ in range(n))
+        paragraphs.append(f'<p>{text} <a href="/posts/{rng.randrange(10_000)}.html">more</a>.</p>')
+        remaining -= n
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8">
+<title>Post {i} | Example Blog</title>
+<meta property="og:title" content="Post {i}">
+<meta property="article:published_time" content="2024-03-{i % 28 + 1:02d}T09:00:00Z">
+<link rel="stylesheet" href="/style.css"><script src="/app.js"></script>
+</head><body>
+<header><nav><ul>{nav}</ul></nav></header>
+<main><article><h1>Post {i}</h1>
+<p class="byline">By Jane Doe, March {i % 28 + 1}, 2024</p>
+{"".join(paragraphs)}
+</article></main>
+<aside><h2>Related</h2><ul>{sidebar}</ul></aside>
+<footer><p>Copyright Example Blog</p><a href="/about">About</a> <a href="/feed.xml">RSS</a></footer>
+</body></html>""".encode()
+
+
+def before(html: bytes, url: str) -> tuple:
+    """The BeautifulSoupCrawler path: soup for links, then two trafilatura parses."""
+    soup = BeautifulSoup(html, features="lxml")
+    links = [a.attrs["href"].strip() for a in soup.select("a") if a.attrs.get("href")]
+    serialised = str(soup)
+    body = trafilatura.extract(
+        serialised,
+        output_format="markdown",
+        include_links=True,
+        include_tables=True,
+        url=url,
+    )
+    meta = trafilatura.metadata.extract_metadata(serialised)
+    return links, body, meta
+
+
+def after(html: bytes, url: str) -> tuple:
+    return parse_page(html, url)
+
+
+def measure(label: str, fn, pages: list[tuple[bytes, str]], rounds: int) -> float:
+    fn(*pages[0])  # warm up imports and caches
+    start_cpu, start_wall = time.process_time(), time.perf_counter()
+    for _ in range(rounds):
+        for html, url in pages:
+            fn(html, url)
+    cpu = (time.process_time() - start_cpu) / (rounds * len(pages))
+    wall = (time.perf_counter() - start_wall) / (rounds * len(pages))
+    print(f"{label:<28} {cpu * 1000:7.2f} ms CPU/page   {wall * 1000:7.2f} ms wall/page")
+    return cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="*", type=Path, help="HTML files (default: synthetic posts)")
+    parser.add_argument("-n", type=int, default=50, help="synthetic pages")
+    parser.add_argument("--words", type=int, default=1500, help="words per synthetic article")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.files:
+        pages = [(path.read_bytes(), path.resolve().as_uri()) for path in args.files]
+    else:
+        rng = random.Random(0)
+        pages = [
+            (make_page(i, rng, args.words), f"https://blog.example.com/posts/{i}.html")
+            for i in range(args.n)
+        ]
+    size = sum(len(html) for html, _ in pages) / len(pages)
+    print(f"{len(pages)} pages, {size / 1024:.0f} KiB average, {args.rounds} rounds\n")
+
+    old = measure("BeautifulSoup + str(soup)", before, pages, args.rounds)
+    new = measure("parse_page (one lxml tree)", after, pages, args.rounds)
+    print(f"\n{old / new:.2f}x less CPU per page")
+
+
+if __name__ == "__main__":
+    main()
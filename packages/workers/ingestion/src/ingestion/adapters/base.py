@@ -1,12 +1,36 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable
 
-from ..models import Source, ToolResult
+from ..models import ExtractedText, Source, ToolResult
+
+# Items yielded by ``extract_stream``: extracted texts, or warning strings.
+StreamItem = ExtractedText | str
 
 
 class ToolAdapter(ABC):
-    """Base class for all ingestion tool adapters."""
+    """Base class for all ingestion tool adapters.
+
+    *is_known* reports whether a URL is already in the canon; adapters
+    call ``is_known(url)`` to skip fetching pages that dedup would drop.
+    """
+
+    def __init__(self, *, is_known: Callable[[str], bool] | None = None) -> None:
+        self._is_known = is_known
+
+    def is_known(self, url: str) -> bool:
+        return self._is_known is not None and self._is_known(url)
 
     @abstractmethod
-    async def extract(self, source: Source) -> ToolResult:
-        """Extract texts from *source* and return a ToolResult."""
+    def extract_stream(self, source: Source) -> AsyncIterator[StreamItem]:
+        """Yield texts (and warning strings) from *source* as they are extracted."""
         ...
+
+    async def extract(self, source: Source) -> ToolResult:
+        """Collect ``extract_stream`` into a single ToolResult."""
+        result = ToolResult(source_id=source.id)
+        async for item in self.extract_stream(source):
+            if isinstance(item, str):
+                result.errors.append(item)
+            else:
+                result.texts.append(item)
+        return result
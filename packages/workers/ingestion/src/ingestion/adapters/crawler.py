@@ -2,77 +2,285 @@ from __future__ import annotations
 
 import asyncio
 import re
+import uuid
+from contextlib import suppress
+from datetime import timedelta
+from typing import AsyncIterator, Callable, Iterable, Iterator
 from urllib.parse import urljoin, urlparse
 
 import tldextract
-import trafilatura
-from crawlee.crawlers import BeautifulSoupCrawler, BeautifulSoupCrawlingContext
+from crawlee import (
+    ConcurrencySettings,
+    HttpHeaders,
+    Request,
+    RequestOptions,
+    RequestTransformAction,
+)
+from crawlee.crawlers import (
+    BasicCrawlingContext,
+    HttpCrawler,
+    HttpCrawlingContext,
+    ParsedHttpCrawlingContext,
+)
+from crawlee.storages import RequestQueue
 
-from ..models import ExtractedText, Source, ToolResult
-from .base import ToolAdapter
+from ..config import settings
+from ..http_cache import http_cache
+from ..models import ExtractedText, Source
+from ..pipeline.urls import canonicalize_url
+from .base import StreamItem, ToolAdapter
+from .discovery import FETCH_TIMEOUT, MAX_FEEDS, discover, discover_feeds
+from .extraction import extractor
+from .politeness import scheduler
 
 
 class CrawlerAdapter(ToolAdapter):
     """Crawl a website, follow links, and extract article text as Markdown.
 
-    Uses crawlee (BeautifulSoupCrawler) for link discovery and traversal,
-    and trafilatura for content extraction. No browser required.
+    Uses crawlee (HttpCrawler) for fetching and traversal, and trafilatura
+    for content extraction. No browser required. The raw response is
+    parsed once, in the shared process pool (see ``extraction.py``), for
+    its links, text and metadata, so HTML parsing does not block the event
+    loop.
+
+    Pages are handed to the consumer through a bounded queue as they are
+    extracted, so the crawl pauses when the consumer falls behind.
+
+    Before crawling, the site's sitemaps are read (see ``discovery.py``);
+    the feeds the seed page links to are read once the crawl has fetched
+    it, before its links are queued. The article URLs found are queued
+    directly, newest first. Links are then only followed from the seed
+    page; the full link walk is the fallback for sites without either.
+
+    Links are deduplicated by canonical URL, and links already in the canon
+    (per ``is_known``) are never requested; the seed URL always is.
+
+    Pages are re-requested conditionally (see ``http_cache``) when a ``304``
+    loses nothing: the page produced no text last time (hubs, listings) or
+    is already in the canon. A ``304`` skips parsing and extraction and
+    re-enqueues the links found on the last full fetch.
+
+    Requests wait for a slot from the per-host ``politeness.scheduler``,
+    which adapts concurrency to the site's latency and errors and honours
+    ``Retry-After`` and robots.txt ``Crawl-delay``.
     """
 
-    def __init__(self, max_pages: int = 10000) -> None:
+    def __init__(
+        self,
+        max_pages: int = 10000,
+        buffer_size: int = 32,
+        *,
+        is_known: Callable[[str], bool] | None = None,
+    ) -> None:
+        super().__init__(is_known=is_known)
         self.max_pages = max_pages
+        self.buffer_size = buffer_size
+        self.cache = http_cache if settings.http_cache else None
 
-    async def extract(self, source: Source) -> ToolResult:
-        texts: list[ExtractedText] = []
-        errors: list[str] = []
+    async def extract_stream(self, source: Source) -> AsyncIterator[StreamItem]:
+        queue: asyncio.Queue[StreamItem | None] = asyncio.Queue(self.buffer_size)
         allowed_domain = tldextract.extract(source.url).registered_domain
+        same_site = re.compile(rf"^https?://(.*\.)?{re.escape(allowed_domain)}(/.*)?$")
 
-        crawler = BeautifulSoupCrawler(
+        # A private request queue per crawl: the default one is shared by
+        # every crawler in the process, so a re-crawl would see the seed as
+        # already handled and fetch nothing.
+        request_queue = await RequestQueue.open(alias=f"crawl-{uuid.uuid4().hex}")
+        crawler = HttpCrawler(
             max_requests_per_crawl=self.max_pages,
+            request_manager=request_queue,
+            # Requests beyond the host's limit wait in the scheduler, so
+            # crawlee only needs a few more tasks than that, and the
+            # navigation timeout covers the wait for a slot.
+            concurrency_settings=ConcurrencySettings(
+                max_concurrency=2 * settings.crawl_host_max_concurrency
+            ),
+            navigation_timeout=timedelta(seconds=60 + 2 * settings.crawl_max_delay),
+            # The seed page's handler reads its feeds, each waiting for a
+            # slot and then for the response.
+            request_handler_timeout=timedelta(
+                seconds=60 + MAX_FEEDS * (FETCH_TIMEOUT + settings.crawl_max_delay)
+            ),
         )
+        skipped: set[str] = set()
+        not_modified = 0
+        cache = self.cache
+
+        def skip_known(options: RequestOptions) -> RequestOptions | RequestTransformAction:
+            canonical = canonicalize_url(options["url"])
+            if canonical in skipped or self.is_known(canonical):
+                skipped.add(canonical)
+                return "skip"
+            options["unique_key"] = canonical
+            return options
+
+        def requests_for(
+            urls: Iterable[str], *, follow: bool, lastmods: dict[str, str | None] | None = None
+        ) -> Iterator[Request]:
+            # ``follow``: whether links on the page are enqueued in turn.
+            for link in urls:
+                options = skip_known(RequestOptions(url=link))
+                if options != "skip":
+                    lastmod = lastmods.get(link) if lastmods else None
+                    options["user_data"] = {"follow": follow, "lastmod": lastmod}
+                    yield Request.from_url(**options)
+
+        # Follow links from every page, unless discovery found the articles.
+        walk = True
+
+        async def read_feeds(feeds: list[str]) -> list[Request]:
+            # Called from the seed page's handler before its links are
+            # queued, so they are queued with the final ``walk``.
+            nonlocal walk
+            if not feeds or not settings.crawl_discovery:
+                return []
+            discovery = await discover_feeds(source.url, feeds, limit=self.max_pages, cache=cache)
+            if not discovery.pages:
+                return []
+            walk = False
+            await queue.put(discovery.summary())
+            lastmods = {page.url: page.lastmod for page in discovery.pages}
+            return list(requests_for(lastmods, follow=False, lastmods=lastmods))
+
+        # Scheduler slots held by requests in flight, by request object:
+        # the URL the slot was taken for and its start time.
+        started: dict[int, tuple[str, float]] = {}
+
+        def release(request: Request, status: int | None, retry_after: str | None = None) -> None:
+            slot = started.pop(id(request), None)
+            if slot is not None:
+                scheduler.release(*slot, status=status, retry_after=retry_after)
+
+        @crawler.pre_navigation_hook
+        async def wait_for_slot(context: BasicCrawlingContext) -> None:
+            url = context.request.url
+            started[id(context.request)] = (url, await scheduler.acquire(url))
+
+        @crawler.post_navigation_hook
+        async def record_response(context: HttpCrawlingContext) -> None:
+            response = context.http_response
+            release(context.request, response.status_code, response.headers.get("retry-after"))
+
+        @crawler.error_handler
+        async def on_error(context: BasicCrawlingContext, error: Exception) -> None:
+            release(context.request, None)  # failed before a response
+
+        @crawler.failed_request_handler
+        async def on_failed(context: BasicCrawlingContext, error: Exception) -> None:
+            release(context.request, None)
+
+        if cache is not None:
+
+            @crawler.pre_navigation_hook
+            async def conditional(context: BasicCrawlingContext) -> None:
+                entry = cache.get(context.request.url)
+                if entry is None:
+                    return
+                if entry.data.get("extracted") and not self.is_known(context.request.url):
+                    return  # its text is needed again
+                context.request.headers = context.request.headers | HttpHeaders(
+                    entry.conditional_headers()
+                )
 
         @crawler.router.default_handler
-        async def handler(context: BeautifulSoupCrawlingContext) -> None:
+        async def handler(context: ParsedHttpCrawlingContext[bytes]) -> None:
+            nonlocal not_modified
             url = context.request.url
+            response = context.http_response
+            follow = context.request.user_data.get("follow", True)
+            lastmod = context.request.user_data.get("lastmod")
+            is_seed = context.request.user_data.get("seed", False)
 
-            # Enqueue same-domain links.
-            await context.enqueue_links(
-                strategy="all",
-                include=[re.compile(rf"^https?://(.*\.)?{re.escape(allowed_domain)}(/.*)?$")],
-            )
+            if response.status_code == 304 and cache is not None:
+                entry = cache.get(url)
+                if follow and entry is not None:
+                    found = await read_feeds(entry.data.get("feeds", [])) if is_seed else []
+                    links = entry.data.get("links", [])
+                    await context.add_requests(found + list(requests_for(links, follow=walk)))
+                not_modified += 1
+                return
 
-            # Extract article content via trafilatura.
-            html = str(context.soup)
-            body = trafilatura.extract(
-                html,
-                output_format="markdown",
-                include_links=True,
-                include_tables=True,
-                url=url,
+            # Links and article content from one parse, off the event loop.
+            parsed = await extractor.extract(
+                context.parsed_content, context.request.loaded_url or url
             )
+            page = parsed.page
 
-            if not body or len(body.split()) < 50:
-                return  # skip navigational / thin pages
+            # Enqueue same-domain links, after the articles in the seed
+            # page's feeds.
+            links = [link for link in parsed.links if same_site.match(link)]
+            if follow:
+                found = await read_feeds(parsed.feeds) if is_seed else []
+                await context.add_requests(found + list(requests_for(links, follow=walk)))
 
-            meta = trafilatura.metadata.extract_metadata(html)
-            title = (meta.title if meta else None) or url.rsplit("/", 1)[-1]
-            date = (meta.date if meta else None) or None
+            if cache is not None:
+                data = {"links": links, "extracted": page is not None}
+                if is_seed:
+                    data["feeds"] = parsed.feeds
+                cache.store(
+                    url,
+                    etag=response.headers.get("etag"),
+                    last_modified=response.headers.get("last-modified"),
+                    data=data,
+                )
+            if page is None:
+                return  # skip navigational / thin pages
 
-            texts.append(
+            await queue.put(
                 ExtractedText(
-                    title=title,
-                    body=body,
+                    title=page.title or url.rsplit("/", 1)[-1],
+                    body=page.body,
                     source_url=url,
-                    date=date,
+                    date=page.date or (lastmod[:10] if lastmod else None),
                 )
             )
 
-        try:
-            await crawler.run([source.url])
-        except Exception as exc:
-            errors.append(f"CrawlerAdapter error: {exc}")
+        async def run() -> None:
+            nonlocal walk
+            try:
+                seeds = [
+                    Request.from_url(
+                        source.url,
+                        unique_key=canonicalize_url(source.url),
+                        user_data={"follow": True, "seed": True},
+                    )
+                ]
+                if settings.crawl_discovery:
+                    discovery = await discover(source.url, limit=self.max_pages, cache=cache)
+                    if discovery.pages:
+                        walk = False
+                        await queue.put(discovery.summary())
+                        lastmods = {page.url: page.lastmod for page in discovery.pages}
+                        seeds.extend(requests_for(lastmods, follow=False, lastmods=lastmods))
+                await crawler.run(seeds)
+            except Exception as exc:
+                await queue.put(f"CrawlerAdapter error: {exc}")
+            # Not on cancellation: the consumer is gone and the queue may be
+            # full, so the put would never return.
+            await queue.put(None)
 
-        if not texts and not errors:
-            errors.append(f"No content extracted from {source.url}")
+        task = asyncio.create_task(run())
+        produced = 0
+        try:
+            while (item := await queue.get()) is not None:
+                if not isinstance(item, str):
+                    produced += 1
+                yield item
+        finally:
+            # Consumer stopped early (error or cancellation): stop the crawl
+            # and give back the scheduler slots of requests cut off by it.
+            if not task.done():
+                task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+            for url, start in started.values():
+                scheduler.release(url, start)
+            started.clear()
+            await request_queue.drop()
 
-        return ToolResult(source_id=source.id, texts=texts, errors=errors)
+        if not_modified:
+            yield f"{not_modified} pages not modified since the last crawl"
+        if skipped:
+            yield f"Skipped {len(skipped)} pages already in the canon"
+        elif not produced and not not_modified:
+            yield f"No content extracted from {source.url}"
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, NamedTuple
+from urllib.parse import urljoin, urlsplit
+
+import feedparser
+import httpx
+import tldextract
+from lxml import etree
+
+from ..http_cache import HTTPCache
+from ..pipeline.urls import canonicalize_url
+from .politeness import scheduler
+
+# Sitemaps fetched per discovery, including children of sitemap indexes.
+_MAX_SITEMAPS = 64
+# Feeds read from one seed page.
+MAX_FEEDS = 4
+# Seconds per sitemap or feed request.
+FETCH_TIMEOUT = 20
+# Largest sitemap read, after decompression (the sitemap protocol's limit).
+_MAX_SITEMAP_BYTES = 50 << 20
+# Entities are left unexpanded, so a sitemap cannot blow up in memory or
+# pull in local files.
+_SITEMAP_PARSER = etree.XMLParser(
+    resolve_entities=False, no_network=True, remove_comments=True, remove_pis=True
+)
+_ASSET_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".css", ".js",
+    ".zip", ".gz", ".mp3", ".mp4", ".mov", ".woff", ".woff2", ".xml", ".json",
+)
+_USER_AGENT = "Mozilla/5.0 (compatible; bibliotalk-ingestion)"
+
+
+class Discovered(NamedTuple):
+    url: str
+    lastmod: str | None
+
+
+@dataclass
+class Discovery:
+    """Article URLs found for a site, newest first, and where they came from."""
+
+    pages: list[Discovered] = field(default_factory=list)
+    sitemaps: int = 0
+    feeds: int = 0
+    fetches: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"Discovered {len(self.pages)} pages from {self.sitemaps} sitemaps "
+            f"and {self.feeds} feeds ({self.fetches} requests)"
+        )
+
+
+async def discover(
+    seed: str,
+    *,
+    limit: int,
+    cache: HTTPCache | None = None,
+) -> Discovery:
+    """Find article URLs for *seed*'s site in its sitemaps.
+
+    Reads the sitemaps listed in robots.txt (or ``/sitemap.xml``),
+    following sitemap indexes. Only pages on the seed's site and under its
+    directory are kept, at most *limit* of them, newest ``lastmod`` first.
+    Requests go through the politeness scheduler and, with *cache*, are
+    conditional.
+    """
+    found = Discovery()
+    pages = _Pages(seed)
+    parts = urlsplit(seed)
+
+    async with _client() as client:
+        fetch = _Fetcher(client, cache, found)
+        root = f"{parts.scheme}://{parts.netloc}"
+
+        # The scheduler has usually read robots.txt already.
+        sitemaps = await scheduler.sitemaps(seed)
+        if sitemaps is None:
+            sitemaps = (await fetch(f"{root}/robots.txt", _parse_robots)).get("sitemaps", [])
+        queue = sitemaps or [f"{root}/sitemap.xml"]
+        seen: set[str] = set()
+        while queue and found.sitemaps < _MAX_SITEMAPS and len(pages) < limit:
+            url = queue.pop(0)
+            if url in seen:
+                continue
+            seen.add(url)
+            sitemap = await fetch(url, _parse_sitemap)
+            if not sitemap:
+                continue
+            found.sitemaps += 1
+            for loc, lastmod in sitemap.get("urls", []):
+                pages.keep(loc, lastmod)
+            # Newest child sitemaps first, so a capped discovery keeps
+            # recent articles.
+            children = sorted(sitemap.get("sitemaps", []), key=lambda c: c[1] or "", reverse=True)
+            queue.extend(loc for loc, _ in children)
+
+    found.pages = pages.newest(limit)
+    return found
+
+
+async def discover_feeds(
+    seed: str,
+    feeds: Iterable[str],
+    *,
+    limit: int,
+    cache: HTTPCache | None = None,
+) -> Discovery:
+    """Find article URLs for *seed*'s site in the *feeds* its page links to.
+
+    The crawler finds the feeds while parsing the seed page it fetched (see
+    ``extraction.find_feeds``), so the page is not requested again here.
+    At most ``MAX_FEEDS`` feeds are read; pages are filtered and ordered as
+    in ``discover``.
+    """
+    found = Discovery()
+    pages = _Pages(seed)
+    async with _client() as client:
+        fetch = _Fetcher(client, cache, found)
+        for feed_url in list(feeds)[:MAX_FEEDS]:
+            feed = await fetch(feed_url, _parse_feed)
+            if feed:
+                found.feeds += 1
+            for link, updated in feed.get("urls", []):
+                pages.keep(link, updated)
+    found.pages = pages.newest(limit)
+    return found
+
+
+class _Pages:
+    """Article URLs on *seed*'s site and under its directory, by canonical URL."""
+
+    def __init__(self, seed: str) -> None:
+        self.domain = tldextract.extract(seed).registered_domain
+        self.prefix = urlsplit(seed).path.rsplit("/", 1)[0] + "/"
+        self.seed_key = canonicalize_url(seed)
+        self.pages: dict[str, Discovered] = {}
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def keep(self, url: str, lastmod: str | None) -> None:
+        split = urlsplit(url)
+        if split.scheme not in ("http", "https"):
+            return
+        if tldextract.extract(url).registered_domain != self.domain:
+            return
+        if not split.path.startswith(self.prefix) or split.path.lower().endswith(_ASSET_EXTENSIONS):
+            return
+        key = canonicalize_url(url)
+        if key == self.seed_key:
+            return
+        previous = self.pages.get(key)
+        if previous is None or (lastmod or "") > (previous.lastmod or ""):
+            self.pages[key] = Discovered(url, lastmod)
+
+    def newest(self, limit: int) -> list[Discovered]:
+        return sorted(self.pages.values(), key=lambda p: p.lastmod or "", reverse=True)[:limit]
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        follow_redirects=True, timeout=FETCH_TIMEOUT, headers={"User-Agent": _USER_AGENT}
+    )
+
+
+class _Fetcher:
+    """GET a URL politely and parse it, replaying the parse on a 304.
+
+    Cache entries are keyed apart from the crawler's, which may fetch the
+    same URLs.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, cache: HTTPCache | None, found: Discovery) -> None:
+        self.client = client
+        self.cache = cache
+        self.found = found
+
+    async def __call__(self, url: str, parse: Callable[[bytes, str], dict]) -> dict:
+        key = f"discovery:{url}"
+        cached = self.cache.get(key) if self.cache is not None else None
+        headers = cached.conditional_headers() if cached is not None else {}
+        started = await scheduler.acquire(url)
+        response: httpx.Response | None = None
+        try:
+            response = await self.client.get(url, headers=headers)
+        except httpx.HTTPError:
+            return {}
+        finally:
+            self.found.fetches += 1
+            if response is None:
+                scheduler.release(url, started)
+            else:
+                scheduler.release(
+                    url,
+                    started,
+                    status=response.status_code,
+                    retry_after=response.headers.get("retry-after"),
+                )
+        status = response.status_code
+        if status == 304 and cached is not None:
+            return cached.data
+        if status != 200:
+            return {}
+        try:
+            data = parse(response.content, str(response.url))
+        except (etree.XMLSyntaxError, zlib.error, ValueError, OSError):
+            return {}
+        if self.cache is not None:
+            self.cache.store(
+                key,
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+                data=data,
+            )
+        return data
+
+
+def _parse_robots(content: bytes, url: str) -> dict:
+    sitemaps = []
+    for line in content.decode("utf-8", "replace").splitlines():
+        key, _, value = line.partition(":")
+        if key.strip().lower() == "sitemap" and value.strip():
+            sitemaps.append(urljoin(url, value.strip()))
+    return {"sitemaps": sitemaps}
+
+
+def _parse_sitemap(content: bytes, url: str) -> dict:
+    """``<urlset>`` locations and ``<sitemapindex>`` children, with lastmod."""
+    if content[:2] == b"\x1f\x8b":
+        content = _gunzip(content)
+    elif len(content) > _MAX_SITEMAP_BYTES:
+        raise ValueError(f"sitemap larger than {_MAX_SITEMAP_BYTES} bytes")
+    urls: list[list] = []
+    sitemaps: list[list] = []
+    for element in etree.fromstring(content, _SITEMAP_PARSER).iterchildren(etree.Element):
+        kind = _local(element.tag)
+        if kind not in ("url", "sitemap"):
+            continue
+        loc = lastmod = None
+        for child in element.iterchildren(etree.Element):
+            name = _local(child.tag)
+            if name == "loc" and child.text:
+                loc = urljoin(url, child.text.strip())
+            elif name == "lastmod" and child.text:
+                lastmod = child.text.strip()
+        if loc:
+            (urls if kind == "url" else sitemaps).append([loc, lastmod])
+    return {"urls": urls, "sitemaps": sitemaps}
+
+
+def _gunzip(content: bytes) -> bytes:
+    decompressor = zlib.decompressobj(wbits=31)  # gzip header and trailer
+    data = decompressor.decompress(content, _MAX_SITEMAP_BYTES)
+    if decompressor.unconsumed_tail:
+        raise ValueError(f"sitemap larger than {_MAX_SITEMAP_BYTES} bytes")
+    return data
+
+
+def _parse_feed(content: bytes, url: str) -> dict:
+    feed = feedparser.parse(content)
+    urls = []
+    for entry in feed.entries:
+        if not entry.get("link"):
+            continue
+        parsed = entry.get("updated_parsed") or entry.get("published_parsed")
+        updated = time.strftime("%Y-%m-%dT%H:%M:%SZ", parsed) if parsed else None
+        urls.append([urljoin(url, entry["link"]), updated])
+    return {"urls": urls}
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+from urllib.parse import urljoin, urlsplit
+
+import trafilatura
+from lxml.html import HtmlElement
+from trafilatura.core import determine_returnstring
+from trafilatura.settings import Extractor
+from trafilatura.utils import load_html
+
+from ..config import settings
+
+_FEED_TYPES = {"application/rss+xml", "application/atom+xml", "application/feed+json"}
+
+
+class Page(NamedTuple):
+    body: str
+    title: str | None
+    date: str | None
+
+
+class ParsedPage(NamedTuple):
+    links: list[str]
+    feeds: list[str]
+    page: Page | None
+
+
+def extract_page(html: bytes | str | HtmlElement, url: str) -> Page | None:
+    """Extract article Markdown and metadata from *html*.
+
+    Content and metadata are read from one parsed tree. Returns ``None``
+    for navigational / thin pages.
+    """
+    tree = html if isinstance(html, HtmlElement) else load_html(html)
+    if tree is None:
+        return None
+    options = Extractor(
+        output_format="markdown",
+        links=True,
+        tables=True,
+        url=url,
+        with_metadata=True,
+    )
+    document = trafilatura.bare_extraction(tree, options=options)
+    if document is None:
+        return None
+    # The body alone: with metadata on, Markdown gets a YAML header.
+    options.with_metadata = False
+    body = determine_returnstring(document, options)
+    if not body or len(body.split()) < 50:
+        return None
+    return Page(body=body, title=document.title, date=document.date or None)
+
+
+def parse_page(html: bytes, url: str) -> ParsedPage:
+    """Parse the raw response *html* once for its links, feeds and article.
+
+    Runs in worker processes, so it must stay a picklable top-level
+    function.
+    """
+    tree = load_html(html)
+    if tree is None:
+        return ParsedPage([], [], None)
+    # Links first: extraction prunes the tree.
+    base_url = _base_url(tree, url)
+    return ParsedPage(
+        find_links(tree, base_url), find_feeds(tree, base_url), extract_page(tree, url)
+    )
+
+
+def find_links(tree: HtmlElement, base_url: str) -> list[str]:
+    """Absolute http(s) ``<a href>`` targets, resolved against *base_url*."""
+    links: dict[str, None] = {}
+    for href in tree.xpath("//a/@href"):
+        try:
+            link = urljoin(base_url, str(href).strip())
+        except ValueError:
+            continue
+        if urlsplit(link).scheme in ("http", "https"):
+            links.setdefault(link)
+    return list(links)
+
+
+def find_feeds(tree: HtmlElement, base_url: str) -> list[str]:
+    """RSS/Atom/JSON feeds named by ``<link rel="alternate">``, made absolute."""
+    feeds: dict[str, None] = {}
+    for link in tree.xpath("//link[@href]"):
+        rel = str(link.get("rel") or "").lower().split()
+        kind = str(link.get("type") or "").strip().lower()
+        if "alternate" not in rel or kind not in _FEED_TYPES:
+            continue
+        try:
+            feeds.setdefault(urljoin(base_url, str(link.get("href")).strip()))
+        except ValueError:
+            continue
+    return list(feeds)
+
+
+def _base_url(tree: HtmlElement, url: str) -> str:
+    """*url*, or the document's ``<base href>`` resolved against it."""
+    base = tree.xpath("//base/@href")
+    return urljoin(url, str(base[0]).strip()) if base else url
+
+
+class HTMLExtractor:
+    """Run ``parse_page`` off the event loop, in a shared process pool.
+
+    At most ``max_inflight`` pages are queued for extraction at once;
+    callers beyond that wait, which throttles the crawl feeding them.
+    With ``workers=0`` extraction runs in a thread instead.
+    """
+
+    def __init__(self, workers: int | None = None, max_inflight: int | None = None) -> None:
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_inflight = max_inflight or 2 * max(1, self.workers)
+        self._pool: ProcessPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    async def extract(self, html: bytes, url: str) -> ParsedPage:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_inflight)
+        async with self._slots:
+            if self.workers == 0:
+                return await asyncio.to_thread(parse_page, html, url)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), parse_page, html, url)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._slots = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and threads
+            # is unsafe.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+
+extractor = HTMLExtractor(settings.extract_workers, settings.extract_max_inflight)
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import asyncio
 from pathlib import Path
+from typing import AsyncIterator
 
 from markitdown import MarkItDown
 
-from ..models import ExtractedText, Source, ToolResult
-from .base import ToolAdapter
+from ..models import ExtractedText, Source
+from .base import StreamItem, ToolAdapter
 
 
 class DocAdapter(ToolAdapter):
@@ -16,34 +17,28 @@ class DocAdapter(ToolAdapter):
     path (written by the upload endpoint).
     """
 
-    async def extract(self, source: Source) -> ToolResult:
-        return await asyncio.to_thread(self._extract_sync, source)
+    async def extract_stream(self, source: Source) -> AsyncIterator[StreamItem]:
+        for item in await asyncio.to_thread(self._extract_sync, source):
+            yield item
 
-    def _extract_sync(self, source: Source) -> ToolResult:
+    def _extract_sync(self, source: Source) -> list[StreamItem]:
         path = Path(source.url)
         if not path.exists():
-            return ToolResult(
-                source_id=source.id,
-                errors=[f"File not found: {source.url}"],
-            )
-
-        texts: list[ExtractedText] = []
-        errors: list[str] = []
+            return [f"File not found: {source.url}"]
 
         try:
             md = MarkItDown()
             result = md.convert(str(path))
             body = (result.text_content or "").strip()
-
-            if body:
-                texts.append(
-                    ExtractedText(
-                        title=source.label or path.stem,
-                        body=body,
-                        source_url=source.url,
-                    )
-                )
         except Exception as exc:
-            errors.append(f"DocAdapter error for {path.name}: {exc}")
-
-        return ToolResult(source_id=source.id, texts=texts, errors=errors)
+            return [f"DocAdapter error for {path.name}: {exc}"]
+
+        if not body:
+            return []
+        return [
+            ExtractedText(
+                title=source.label or path.stem,
+                body=body,
+                source_url=source.url,
+            )
+        ]
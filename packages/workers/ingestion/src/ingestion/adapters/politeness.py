@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from ..config import settings
+
+# Multiplicative decrease on rate limiting (429/503), and on other server
+# errors, timeouts or latency inflation.
+_THROTTLE_BACKOFF = 0.5
+_ERROR_BACKOFF = 0.75
+_LATENCY_ALPHA = 0.2
+_BASELINE_DRIFT = 0.01
+_RATE_WINDOW = 60.0
+_ROBOTS_TTL = 24 * 3600.0
+
+
+@dataclass
+class _Host:
+    limit: float
+    inflight: int = 0
+    next_start: float = 0.0
+    crawl_delay: float = 0.0
+    sitemaps: list[str] = field(default_factory=list)
+    robots: str = "pending"  # pending | loading | done
+    robots_read: float = 0.0
+    latency: float | None = None
+    base_latency: float | None = None
+    last_decrease: float = 0.0
+    throttle_streak: int = 0
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    completed: deque[float] = field(default_factory=deque)
+    waiters: list[asyncio.Future] = field(default_factory=list)
+
+
+class HostScheduler:
+    """Per-host politeness for crawls: AIMD concurrency, delays and stats.
+
+    Each host starts at *initial* concurrent requests. Every successful
+    response adds ``1/limit`` (one extra slot per window of requests) up
+    to *maximum*; a 429/503 halves the limit, and a 5xx, a network error
+    or latency above *latency_factor* times the host's best latency cuts
+    it by a quarter, at most once per round trip. ``Retry-After`` and
+    robots.txt ``Crawl-delay`` (both capped at *max_delay* seconds) hold
+    back the host's next request; a 429 without ``Retry-After`` backs off
+    exponentially.
+
+    State is per host and process-wide, so concurrent crawls of the same
+    site share one budget. ``acquire`` before each request and
+    ``release`` after it.
+    """
+
+    def __init__(
+        self,
+        initial: int = 2,
+        maximum: int = 8,
+        *,
+        max_delay: float = 30.0,
+        latency_factor: float = 3.0,
+        respect_robots: bool = True,
+    ) -> None:
+        self.initial = max(1, initial)
+        self.maximum = max(self.initial, maximum)
+        self.max_delay = max_delay
+        self.latency_factor = latency_factor
+        self.respect_robots = respect_robots
+        self._hosts: dict[str, _Host] = {}
+
+    async def acquire(self, url: str) -> float:
+        """Wait for a slot on *url*'s host; return the start time for ``release``."""
+        host = self._host_for(url)
+        await self._read_robots(host, url)
+
+        loop = asyncio.get_running_loop()
+        while True:
+            now = time.monotonic()
+            has_slot = host.inflight < int(host.limit)
+            if has_slot and now >= host.next_start:
+                break
+            waiter = loop.create_future()
+            host.waiters.append(waiter)
+            try:
+                timeout = host.next_start - now if has_slot else None
+                await asyncio.wait_for(waiter, timeout)
+            except TimeoutError:
+                pass
+            finally:
+                if waiter in host.waiters:
+                    host.waiters.remove(waiter)
+
+        host.inflight += 1
+        if host.crawl_delay:
+            host.next_start = now + host.crawl_delay
+        return now
+
+    def release(
+        self,
+        url: str,
+        started: float,
+        *,
+        status: int | None = None,
+        retry_after: str | None = None,
+    ) -> None:
+        """Record a finished request; *status* ``None`` means it failed."""
+        host = self._hosts[_host(url)]
+        now = time.monotonic()
+        host.inflight = max(0, host.inflight - 1)
+        host.requests += 1
+        host.completed.append(now)
+        while host.completed and host.completed[0] < now - _RATE_WINDOW:
+            host.completed.popleft()
+
+        if status in (429, 503):
+            host.throttled += 1
+            host.throttle_streak += 1
+            self._decrease(host, now, _THROTTLE_BACKOFF)
+            pause = _parse_retry_after(retry_after)
+            if pause is None and status == 429:
+                pause = 2.0 ** (host.throttle_streak - 1)
+            if pause:
+                host.next_start = max(host.next_start, now + min(pause, self.max_delay))
+        elif status is None or status >= 500:
+            host.errors += 1
+            self._decrease(host, now, _ERROR_BACKOFF)
+        else:
+            host.throttle_streak = 0
+            latency = now - started
+            host.latency = (
+                latency
+                if host.latency is None
+                else host.latency + _LATENCY_ALPHA * (latency - host.latency)
+            )
+            # The baseline follows drops at once and sustained rises slowly,
+            # so a site that got slower for good is not throttled forever.
+            if host.base_latency is None or host.latency < host.base_latency:
+                host.base_latency = host.latency
+            else:
+                host.base_latency += _BASELINE_DRIFT * (host.latency - host.base_latency)
+            if host.latency > self.latency_factor * host.base_latency:
+                self._decrease(host, now, _ERROR_BACKOFF)
+            else:
+                host.limit = min(float(self.maximum), host.limit + 1.0 / host.limit)
+        _wake(host)
+
+    async def sitemaps(self, url: str) -> list[str] | None:
+        """Sitemap URLs listed in the host's robots.txt, or None if it is not read."""
+        if not self.respect_robots:
+            return None
+        host = self._host_for(url)
+        await self._read_robots(host, url)
+        return list(host.sitemaps)
+
+    def stats(self) -> dict[str, dict]:
+        now = time.monotonic()
+        out = {}
+        for name, host in sorted(self._hosts.items()):
+            recent = sum(1 for t in host.completed if t >= now - _RATE_WINDOW)
+            out[name] = {
+                "concurrency": int(host.limit),
+                "limit": round(host.limit, 2),
+                "inflight": host.inflight,
+                "requests": host.requests,
+                "errors": host.errors,
+                "throttled": host.throttled,
+                "requests_per_min": recent,
+                "latency_ms": round(host.latency * 1000, 1) if host.latency is not None else None,
+                "base_latency_ms": (
+                    round(host.base_latency * 1000, 1) if host.base_latency is not None else None
+                ),
+                "crawl_delay": host.crawl_delay,
+                "paused_for": round(max(0.0, host.next_start - now), 2),
+            }
+        return out
+
+    def _host_for(self, url: str) -> _Host:
+        name = _host(url)
+        host = self._hosts.get(name)
+        if host is None:
+            host = self._hosts[name] = _Host(limit=float(self.initial))
+        return host
+
+    async def _read_robots(self, host: _Host, url: str) -> None:
+        """Read robots.txt once per host (and again after a day); others wait."""
+        if not self.respect_robots:
+            return
+        if host.robots == "done" and time.monotonic() - host.robots_read > _ROBOTS_TTL:
+            host.robots = "pending"
+        if host.robots == "pending":
+            host.robots = "loading"
+            try:
+                delay, host.sitemaps = await _fetch_robots(url)
+                host.crawl_delay = min(delay, self.max_delay)
+            finally:
+                host.robots = "done"
+                host.robots_read = time.monotonic()
+                _wake(host)
+        loop = asyncio.get_running_loop()
+        while host.robots == "loading":
+            waiter = loop.create_future()
+            host.waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in host.waiters:
+                    host.waiters.remove(waiter)
+
+    def _decrease(self, host: _Host, now: float, factor: float) -> None:
+        # Responses already in flight reflect the old limit; react to them
+        # once per round trip rather than once each.
+        if now - host.last_decrease < (host.latency or 1.0):
+            return
+        host.limit = max(1.0, host.limit * factor)
+        host.last_decrease = now
+
+
+def _host(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def _wake(host: _Host) -> None:
+    for waiter in host.waiters:
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+async def _fetch_robots(url: str) -> tuple[float, list[str]]:
+    """The ``Crawl-delay`` (or ``Request-rate``) for ``*`` and the sitemaps in robots.txt."""
+    parts = urlsplit(url)
+    try:
+        async with httpx.AsyncClient(timeout=10, follow_redirects=True) as client:
+            response = await client.get(f"{parts.scheme}://{parts.netloc}/robots.txt")
+    except httpx.HTTPError:
+        return 0.0, []
+    if response.status_code != 200:
+        return 0.0, []
+    parser = RobotFileParser()
+    parser.parse(response.text.splitlines())
+    delay = parser.crawl_delay("*")
+    if delay is None and (rate := parser.request_rate("*")) is not None and rate.requests:
+        delay = rate.seconds / rate.requests
+    return float(delay or 0.0), parser.site_maps() or []
+
+
+scheduler = HostScheduler(
+    settings.crawl_host_concurrency,
+    settings.crawl_host_max_concurrency,
+    max_delay=settings.crawl_max_delay,
+    latency_factor=settings.crawl_latency_factor,
+    respect_robots=settings.crawl_respect_robots,
+)
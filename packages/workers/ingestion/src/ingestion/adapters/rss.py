@@ -1,62 +1,125 @@
 from __future__ import annotations
 
 import asyncio
+from typing import AsyncIterator
 
 import feedparser
+import httpx
 import trafilatura
 
-from ..models import ExtractedText, Source, ToolResult
-from .base import ToolAdapter
+from ..config import settings
+from ..http_cache import http_cache
+from ..models import ExtractedText, Source
+from .base import StreamItem, ToolAdapter
+
+_ENTRY_FIELDS = ("link", "title", "published", "summary")
+_USER_AGENT = "Mozilla/5.0 (compatible; bibliotalk-ingestion)"
 
 
 class RSSAdapter(ToolAdapter):
-    """Parse an RSS/Atom feed and extract full article text."""
+    """Parse an RSS/Atom feed and extract full article text.
 
-    async def extract(self, source: Source) -> ToolResult:
-        return await asyncio.to_thread(self._extract_sync, source)
+    The feed and its articles are fetched conditionally (see
+    ``http_cache``): an unchanged feed is replayed from the cache, and an
+    article is only revalidated if its text could not be extracted last
+    time, in which case a ``304`` falls straight back to the feed summary.
+    """
 
-    def _extract_sync(self, source: Source) -> ToolResult:
-        texts: list[ExtractedText] = []
-        errors: list[str] = []
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.cache = http_cache if settings.http_cache else None
 
+    async def extract_stream(self, source: Source) -> AsyncIterator[StreamItem]:
         try:
-            feed = feedparser.parse(source.url)
-            for entry in feed.entries:
-                link = entry.get("link", "")
-                title = entry.get("title", "Untitled")
-                published = entry.get("published", "")
-
-                body = ""
-                if link:
-                    try:
-                        downloaded = trafilatura.fetch_url(link)
-                        if downloaded:
-                            body = (
-                                trafilatura.extract(
-                                    downloaded, output_format="markdown"
-                                )
-                                or ""
-                            )
-                    except Exception as exc:
-                        errors.append(
-                            f"trafilatura error for {link}: {exc}"
-                        )
-
-                # Fall back to feed summary if full-text extraction failed.
-                if not body:
-                    body = entry.get("summary", "")
-
-                if body:
-                    texts.append(
-                        ExtractedText(
-                            title=title,
-                            body=body,
-                            source_url=link or source.url,
-                            date=published or None,
-                            metadata={"feed_url": source.url},
-                        )
-                    )
+            entries, not_modified = await asyncio.to_thread(self._fetch_feed, source.url)
         except Exception as exc:
-            errors.append(f"RSSAdapter error: {exc}")
+            yield f"RSSAdapter error: {exc}"
+            return
+        if not_modified:
+            yield "Feed not modified since the last fetch"
+
+        # Fetch one article at a time so each is written before the next
+        # is downloaded. Entries already in the canon are not fetched.
+        skipped = 0
+        with httpx.Client(follow_redirects=True, timeout=30) as client:
+            for entry in entries:
+                if entry.get("link") and self.is_known(entry["link"]):
+                    skipped += 1
+                    continue
+                for item in await asyncio.to_thread(self._extract_entry, client, source, entry):
+                    yield item
+        if skipped:
+            yield f"Skipped {skipped} entries already in the canon"
+
+    def _fetch_feed(self, url: str) -> tuple[list[dict], bool]:
+        """Return the feed's entries and whether they came from the cache."""
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is None:
+            feed = feedparser.parse(url)
+        else:
+            feed = feedparser.parse(url, etag=cached.etag, modified=cached.last_modified)
+            if feed.get("status") == 304:
+                return cached.data.get("entries", []), True
+        entries = [{k: e[k] for k in _ENTRY_FIELDS if k in e} for e in feed.entries]
+        if self.cache is not None:
+            self.cache.store(
+                url,
+                etag=feed.get("etag"),
+                last_modified=feed.get("modified"),
+                data={"entries": entries},
+            )
+        return entries, False
+
+    def _extract_entry(
+        self, client: httpx.Client, source: Source, entry: dict
+    ) -> list[StreamItem]:
+        items: list[StreamItem] = []
+        link = entry.get("link", "")
+        title = entry.get("title", "Untitled")
+        published = entry.get("published", "")
+
+        body = ""
+        if link:
+            try:
+                body = self._fetch_article(client, link)
+            except Exception as exc:
+                items.append(f"fetch error for {link}: {exc}")
+
+        # Fall back to feed summary if full-text extraction failed.
+        if not body:
+            body = entry.get("summary", "")
+
+        if body:
+            items.append(
+                ExtractedText(
+                    title=title,
+                    body=body,
+                    source_url=link or source.url,
+                    date=published or None,
+                    metadata={"feed_url": source.url},
+                )
+            )
+        return items
+
+    def _fetch_article(self, client: httpx.Client, link: str) -> str:
+        """Return the article's extracted text, or "" if there is none."""
+        cached = self.cache.get(link) if self.cache is not None else None
+        # Articles whose text was extracted are already in the canon (and
+        # skipped) or needed again, so only empty results are revalidated.
+        headers = {"User-Agent": _USER_AGENT}
+        if cached is not None and not cached.data.get("extracted"):
+            headers.update(cached.conditional_headers())
+        response = client.get(link, headers=headers)
+        if response.status_code == 304:
+            return ""
+        response.raise_for_status()
+        body = trafilatura.extract(response.content, output_format="markdown") or ""
+        if self.cache is not None:
+            self.cache.store(
+                link,
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+                data={"extracted": bool(body)},
+            )
+        return body
 
-        return ToolResult(source_id=source.id, texts=texts, errors=errors)
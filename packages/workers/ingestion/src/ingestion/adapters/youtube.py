@@ -4,11 +4,12 @@ import asyncio
 import re
 import tempfile
 from pathlib import Path
+from typing import AsyncIterator
 
 import yt_dlp
 
-from ..models import ExtractedText, Source, ToolResult
-from .base import ToolAdapter
+from ..models import ExtractedText, Source
+from .base import StreamItem, ToolAdapter
 
 
 def _parse_vtt(text: str) -> str:
@@ -33,45 +34,41 @@ def _parse_vtt(text: str) -> str:
 class YouTubeAdapter(ToolAdapter):
     """Extract transcripts from YouTube videos, playlists, or channels."""
 
-    async def extract(self, source: Source) -> ToolResult:
-        return await asyncio.to_thread(self._extract_sync, source)
-
-    def _extract_sync(self, source: Source) -> ToolResult:
-        texts: list[ExtractedText] = []
-        errors: list[str] = []
-
+    async def extract_stream(self, source: Source) -> AsyncIterator[StreamItem]:
         try:
-            # Resolve playlist / channel into individual video URLs.
-            with yt_dlp.YoutubeDL({"quiet": True, "extract_flat": True}) as ydl:
-                info = ydl.extract_info(source.url, download=False)
-
-            entries = info.get("entries", [info]) if info else [info]
-            video_urls = [
-                e.get("url") or e.get("webpage_url")
-                for e in entries
-                if e
-            ]
-            if not video_urls:
-                video_urls = [source.url]
-
-            with tempfile.TemporaryDirectory() as tmpdir:
-                for url in video_urls:
-                    try:
-                        self._process_video(url, tmpdir, texts, errors)
-                    except Exception as exc:
-                        errors.append(f"Error processing {url}: {exc}")
+            video_urls = await asyncio.to_thread(self._resolve_videos, source.url)
         except Exception as exc:
-            errors.append(f"YouTubeAdapter error: {exc}")
+            yield f"YouTubeAdapter error: {exc}"
+            return
+
+        known = {url for url in video_urls if self.is_known(url)}
+        if known:
+            yield f"Skipped {len(known)} videos already in the canon"
+            video_urls = [url for url in video_urls if url not in known]
 
-        return ToolResult(source_id=source.id, texts=texts, errors=errors)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for url in video_urls:
+                try:
+                    yield await asyncio.to_thread(self._process_video, url, tmpdir)
+                except Exception as exc:
+                    yield f"Error processing {url}: {exc}"
+
+    @staticmethod
+    def _resolve_videos(url: str) -> list[str]:
+        """Resolve a playlist / channel into individual video URLs."""
+        with yt_dlp.YoutubeDL({"quiet": True, "extract_flat": True}) as ydl:
+            info = ydl.extract_info(url, download=False)
+
+        entries = info.get("entries", [info]) if info else [info]
+        video_urls = [
+            e.get("url") or e.get("webpage_url")
+            for e in entries
+            if e
+        ]
+        return video_urls or [url]
 
     @staticmethod
-    def _process_video(
-        url: str,
-        tmpdir: str,
-        texts: list[ExtractedText],
-        errors: list[str],
-    ) -> None:
+    def _process_video(url: str, tmpdir: str) -> ExtractedText:
         opts = {
             "writesubtitles": True,
             "writeautomaticsub": True,
@@ -105,15 +102,13 @@ class YouTubeAdapter(ToolAdapter):
             if upload_date and len(upload_date) == 8:
                 date = f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:]}"
 
-            texts.append(
-                ExtractedText(
-                    title=title,
-                    body=transcript,
-                    source_url=video_info.get("webpage_url", url),
-                    date=date,
-                    metadata={
-                        "channel": video_info.get("channel", ""),
-                        "duration": video_info.get("duration", 0),
-                    },
-                )
+            return ExtractedText(
+                title=title,
+                body=transcript,
+                source_url=video_info.get("webpage_url", url),
+                date=date,
+                metadata={
+                    "channel": video_info.get("channel", ""),
+                    "duration": video_info.get("duration", 0),
+                },
             )
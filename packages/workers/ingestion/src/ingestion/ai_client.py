@@ -31,8 +31,8 @@ def _sources_json(sources: list[Source]) -> str:
 
 
 def _existing_index_info(session: Session) -> str:
-    if session.existing_index and session.existing_index.entries:
-        n = len(session.existing_index.entries)
+    if session.existing_canon and session.existing_canon.entries:
+        n = session.existing_canon.entries
         return (
             f"An existing canon with {n} entries is loaded. "
             f"The deduplicator will automatically skip entries that already "
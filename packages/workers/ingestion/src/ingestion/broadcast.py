@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from pathlib import Path
+from typing import AsyncIterator
+
+from .config import settings
+from .execlog import read_log
+
+
+class Channel:
+    """Broadcast of one execution's numbered log events to any subscribers.
+
+    Recent events are kept in a ring buffer; subscribers that fall further
+    behind (or reconnect with an older ``Last-Event-ID``) are backfilled
+    from the session's append-only log file.
+    """
+
+    def __init__(self, log_path: Path, start_seq: int, capacity: int) -> None:
+        self.log_path = log_path
+        self.start_seq = start_seq
+        self.closed = False
+        self._buffer: deque[tuple[int, str]] = deque(maxlen=capacity)
+        self._changed = asyncio.Event()
+
+    def publish(self, seq: int, msg: str) -> None:
+        self._buffer.append((seq, msg))
+        self._notify()
+
+    def close(self) -> None:
+        self.closed = True
+        self._notify()
+
+    async def subscribe(self, after: int | None = None) -> AsyncIterator[tuple[int, str]]:
+        """Yield ``(seq, msg)`` for every event after *after* until closed.
+
+        Without *after*, the stream starts at the beginning of this run.
+        """
+        if after is None:
+            after = self.start_seq
+        while True:
+            # Grab the event before reading, so a publish that happens while
+            # we are yielding is not missed.
+            changed = self._changed
+            if self._buffer and self._buffer[0][0] > after + 1:
+                first = self._buffer[0][0]
+                for seq, msg in read_log(self.log_path, after):
+                    if seq >= first:
+                        break
+                    yield seq, msg
+                    after = seq
+            for seq, msg in list(self._buffer):
+                if seq > after:
+                    yield seq, msg
+                    after = seq
+            if self.closed and (not self._buffer or self._buffer[-1][0] <= after):
+                return
+            await changed.wait()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+_channels: dict[str, Channel] = {}
+_opened: dict[str, asyncio.Event] = {}
+
+
+def open_channel(session_id: str, log_path: Path, start_seq: int) -> Channel:
+    channel = Channel(log_path, start_seq, settings.stream_buffer_size)
+    _channels[session_id] = channel
+    if waiter := _opened.pop(session_id, None):
+        waiter.set()
+    return channel
+
+
+def close_channel(session_id: str) -> None:
+    if channel := _channels.pop(session_id, None):
+        channel.close()
+
+
+def get_channel(session_id: str) -> Channel | None:
+    return _channels.get(session_id)
+
+
+async def wait_for_open(session_id: str) -> None:
+    """Wait until an execution opens a channel for *session_id*.
+
+    The channel may already be closed again when this returns.
+    """
+    if session_id not in _channels:
+        await _opened.setdefault(session_id, asyncio.Event()).wait()
@@ -0,0 +1,434 @@
+"""Pack a canon directory into a sharded, compressed bundle and read it back.
+
+Usage::
+
+    ingestion-bundle export output/<session_id> canon.bundle
+    ingestion-bundle ls canon.bundle
+    ingestion-bundle cat canon.bundle canon_0042
+    ingestion-bundle unpack canon.bundle path/to/__CANON__
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Literal, NamedTuple
+
+from .pipeline.index_log import INDEX_JSON, iter_entries
+
+Compression = Literal["zstd", "none"]
+
+MANIFEST = "bundle.json"
+OFFSETS = "offsets.bin"
+IDS = "ids.bin"
+DICTIONARY = "dict.zst"
+
+# 2: records point at their entry id in ids.bin, checked on lookup.
+_FORMAT = 2
+_MAGIC = b"INGBUNDL"
+# magic, format, entry count (padded).
+_HEADER = struct.Struct("<8sIQ")
+_HEADER_SIZE = 32
+# id key, offset in shard, offset of the id in ids.bin, shard number,
+# stored length, original size, id length.
+_RECORD = struct.Struct("<QQQIIII")
+
+# Dictionary training needs enough samples to beat plain per-frame
+# compression; small canons are compressed without one.
+_DICT_MIN_ENTRIES = 64
+_DICT_SAMPLE_BYTES = 16 << 20
+_DICT_SIZE = 112 << 10
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise ImportError(
+            "Compressed bundles require zstandard: pip install 'ingestion[bundle]'"
+        ) from exc
+    return zstandard
+
+
+def _id_key(entry_id: str) -> int:
+    digest = hashlib.blake2b(entry_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _shard_name(n: int, compression: Compression) -> str:
+    return f"shard-{n:05d}.{'zst' if compression == 'zstd' else 'bin'}"
+
+
+@dataclass
+class BundleStats:
+    entries: int = 0
+    shards: int = 0
+    raw_bytes: int = 0
+    packed_bytes: int = 0
+    missing: int = 0
+
+    def summary(self) -> str:
+        ratio = self.raw_bytes / self.packed_bytes if self.packed_bytes else 0.0
+        return (
+            f"{self.entries} entries in {self.shards} shards, "
+            f"{self.raw_bytes / 1024 / 1024:.1f} MiB -> "
+            f"{self.packed_bytes / 1024 / 1024:.1f} MiB ({ratio:.1f}x), "
+            f"{self.missing} missing files skipped"
+        )
+
+
+def export_bundle(
+    canon_dir: str | Path,
+    dest: str | Path,
+    *,
+    compression: Compression = "zstd",
+    level: int = 10,
+    shard_size: int = 256 << 20,
+    overwrite: bool = False,
+) -> BundleStats:
+    """Pack the files listed in *canon_dir*'s index into a bundle at *dest*.
+
+    Each file is stored as an independent zstd frame (sharing a dictionary
+    trained on the canon, when it is large enough), so one entry can be
+    read without decompressing its neighbours. Shards are rolled over once
+    they reach *shard_size* bytes. The bundle is built beside *dest* and
+    renamed into place, so a reader never sees a partial bundle.
+
+    Raises ``ValueError`` if two entries share an id.
+    """
+    canon_dir = Path(canon_dir)
+    dest = Path(dest)
+    if dest.exists() and not overwrite:
+        raise FileExistsError(f"{dest} already exists")
+    header = _index_header(canon_dir)
+    entries = [e for e in iter_entries(canon_dir) if e.get("id") and e.get("filename")]
+    seen: set[str] = set()
+    for entry in entries:
+        if entry["id"] in seen:
+            raise ValueError(f"Duplicate entry id {entry['id']} in {canon_dir}")
+        seen.add(entry["id"])
+
+    tmp = dest.with_name(dest.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    compress = None
+    dict_name = None
+    if compression == "zstd":
+        zstd = _zstd()
+        dict_data = _train_dictionary(zstd, canon_dir, entries)
+        if dict_data is not None:
+            (tmp / DICTIONARY).write_bytes(dict_data.as_bytes())
+            dict_name = DICTIONARY
+        compress = zstd.ZstdCompressor(level=level, dict_data=dict_data).compress
+
+    stats = BundleStats()
+    kept: list[dict] = []
+    records: list[tuple[int, int, int, int, int, int, int]] = []
+    shard, shard_fh, offset = -1, None, shard_size
+    ids_fh = (tmp / IDS).open("wb")
+    try:
+        for entry in entries:
+            try:
+                data = (canon_dir / entry["filename"]).read_bytes()
+            except FileNotFoundError:
+                stats.missing += 1
+                continue
+            frame = compress(data) if compress is not None else data
+            if offset + len(frame) > shard_size and offset > 0:
+                if shard_fh is not None:
+                    shard_fh.close()
+                shard += 1
+                shard_fh = (tmp / _shard_name(shard, compression)).open("wb")
+                offset = 0
+            shard_fh.write(frame)
+            entry_id = entry["id"].encode("utf-8")
+            records.append(
+                (
+                    _id_key(entry["id"]),
+                    offset,
+                    ids_fh.tell(),
+                    shard,
+                    len(frame),
+                    len(data),
+                    len(entry_id),
+                )
+            )
+            ids_fh.write(entry_id)
+            offset += len(frame)
+            kept.append(entry)
+            stats.raw_bytes += len(data)
+            stats.packed_bytes += len(frame)
+    finally:
+        ids_fh.close()
+        if shard_fh is not None:
+            shard_fh.close()
+
+    records.sort()
+    with (tmp / OFFSETS).open("wb") as fh:
+        fh.write(_HEADER.pack(_MAGIC, _FORMAT, len(records)).ljust(_HEADER_SIZE, b"\0"))
+        for record in records:
+            fh.write(_RECORD.pack(*record))
+
+    now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    header["created"] = header["created"] or now
+    (tmp / INDEX_JSON).write_text(
+        json.dumps({**header, "updated": now, "entries": kept}, indent=2),
+        encoding="utf-8",
+    )
+    stats.entries = len(kept)
+    stats.shards = shard + 1
+    manifest = {
+        "format": _FORMAT,
+        "agent_id": header["agent_id"],
+        "created": now,
+        "compression": compression,
+        "dictionary": dict_name,
+        "shards": [_shard_name(n, compression) for n in range(stats.shards)],
+        "entries": stats.entries,
+        "raw_bytes": stats.raw_bytes,
+        "packed_bytes": stats.packed_bytes,
+    }
+    (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    if dest.exists():
+        shutil.rmtree(dest)
+    os.replace(tmp, dest)
+    return stats
+
+
+def _index_header(canon_dir: Path) -> dict:
+    json_path = canon_dir / INDEX_JSON
+    if not json_path.exists():
+        return {"agent_id": canon_dir.name, "created": None}
+    with json_path.open(encoding="utf-8") as fh:
+        existing = json.load(fh)
+    return {"agent_id": existing.get("agent_id", canon_dir.name), "created": existing.get("created")}
+
+
+def _train_dictionary(zstd, canon_dir: Path, entries: list[dict]):
+    if len(entries) < _DICT_MIN_ENTRIES:
+        return None
+    samples: list[bytes] = []
+    total = 0
+    # Evenly spaced samples, so one long source does not dominate.
+    step = max(1, len(entries) // 4096)
+    for entry in entries[::step]:
+        try:
+            data = (canon_dir / entry["filename"]).read_bytes()
+        except FileNotFoundError:
+            continue
+        samples.append(data)
+        total += len(data)
+        if total >= _DICT_SAMPLE_BYTES:
+            break
+    try:
+        return zstd.train_dictionary(_DICT_SIZE, samples)
+    except zstd.ZstdError:
+        return None  # too few or too uniform samples
+
+
+def _member_path(dest: Path, filename: str) -> Path:
+    """*dest* / *filename*, for a plain file name that stays inside *dest*."""
+    if not filename or filename in (".", "..") or Path(filename).name != filename:
+        raise ValueError(f"Unsafe filename in bundle: {filename!r}")
+    path = dest / filename
+    # An existing symlink would redirect the write.
+    if path.resolve().parent != dest.resolve():
+        raise ValueError(f"Bundle file {filename!r} resolves outside {dest}")
+    return path
+
+
+class _Slot(NamedTuple):
+    offset: int
+    shard: int
+    length: int
+    size: int
+
+
+class BundleReader:
+    """Random access to the entries of a bundle by ``IndexEntry.id``.
+
+    The offset table, id table and shards are memory-mapped, so opening a
+    bundle reads only its small manifest, and ``read`` touches just the
+    bytes of one entry. Entry metadata is in the bundle's ``index.json``
+    (``entries``).
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        with (self.path / MANIFEST).open(encoding="utf-8") as fh:
+            self.manifest = json.load(fh)
+        if self.manifest.get("format") != _FORMAT:
+            raise ValueError(f"Unsupported bundle format: {self.manifest.get('format')}")
+        self._table = self._map(self.path / OFFSETS)
+        magic, fmt, count = _HEADER.unpack_from(self._table, 0)
+        if magic != _MAGIC or fmt != _FORMAT:
+            raise ValueError(f"{self.path / OFFSETS} is not a bundle offset table")
+        self._count = count
+        self._ids = self._map(self.path / IDS)
+        self._shards: dict[int, mmap.mmap | bytes] = {}
+        self._decompress = None
+        if self.manifest["compression"] == "zstd":
+            zstd = _zstd()
+            dict_data = None
+            if self.manifest.get("dictionary"):
+                dict_data = zstd.ZstdCompressionDict(
+                    (self.path / self.manifest["dictionary"]).read_bytes()
+                )
+            self._decompress = zstd.ZstdDecompressor(dict_data=dict_data).decompress
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, entry_id: str) -> bool:
+        return self._locate(entry_id) is not None
+
+    def entries(self) -> Iterator[dict]:
+        """Yield the bundle's index entries, in canon order."""
+        return iter_entries(self.path)
+
+    def read_bytes(self, entry_id: str) -> bytes:
+        slot = self._locate(entry_id)
+        if slot is None:
+            raise KeyError(entry_id)
+        shard = self._shard(slot.shard)
+        frame = shard[slot.offset:slot.offset + slot.length]
+        if self._decompress is None:
+            return bytes(frame)
+        return self._decompress(frame, max_output_size=slot.size)
+
+    def read(self, entry_id: str) -> str:
+        return self.read_bytes(entry_id).decode("utf-8")
+
+    def __iter__(self) -> Iterator[tuple[dict, str]]:
+        """Stream ``(entry, content)`` pairs in canon (and shard) order."""
+        for entry in self.entries():
+            yield entry, self.read(entry["id"])
+
+    def unpack(self, dest: str | Path) -> int:
+        """Write the bundle back out as a canon directory; return file count."""
+        dest = Path(dest)
+        dest.mkdir(parents=True, exist_ok=True)
+        # Filenames come from the bundle: check them all before writing.
+        targets = [(entry, _member_path(dest, entry["filename"])) for entry in self.entries()]
+        n = 0
+        for entry, target in targets:
+            target.write_bytes(self.read_bytes(entry["id"]))
+            n += 1
+        shutil.copyfile(self.path / INDEX_JSON, dest / INDEX_JSON)
+        return n
+
+    def close(self) -> None:
+        for shard in self._shards.values():
+            if isinstance(shard, mmap.mmap):
+                shard.close()
+        self._shards.clear()
+        for table in (self._table, self._ids):
+            if isinstance(table, mmap.mmap):
+                table.close()
+
+    def __enter__(self) -> BundleReader:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _locate(self, entry_id: str) -> _Slot | None:
+        key = _id_key(entry_id)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k = struct.unpack_from("<Q", self._table, _HEADER_SIZE + mid * _RECORD.size)[0]
+            if k < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Distinct ids can share a 64-bit key; their records are adjacent.
+        wanted = entry_id.encode("utf-8")
+        for i in range(lo, self._count):
+            k, offset, id_offset, shard, length, size, id_length = _RECORD.unpack_from(
+                self._table, _HEADER_SIZE + i * _RECORD.size
+            )
+            if k != key:
+                break
+            if self._ids[id_offset:id_offset + id_length] == wanted:
+                return _Slot(offset, shard, length, size)
+        return None
+
+    def _shard(self, n: int) -> mmap.mmap | bytes:
+        shard = self._shards.get(n)
+        if shard is None:
+            shard = self._shards[n] = self._map(self.path / self.manifest["shards"][n])
+        return shard
+
+    @staticmethod
+    def _map(path: Path) -> mmap.mmap | bytes:
+        with path.open("rb") as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                return b""  # empty files cannot be mapped
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="pack a canon directory into a bundle")
+    p.add_argument("canon_dir", type=Path)
+    p.add_argument("dest", type=Path)
+    p.add_argument("--level", type=int, default=10, help="zstd level (default: 10)")
+    p.add_argument(
+        "--shard-size", type=int, default=256, help="maximum shard size in MiB (default: 256)"
+    )
+    p.add_argument("--no-compress", action="store_true", help="store entries uncompressed")
+    p.add_argument("--overwrite", action="store_true", help="replace an existing bundle")
+
+    p = sub.add_parser("ls", help="list a bundle's entries")
+    p.add_argument("bundle", type=Path)
+
+    p = sub.add_parser("cat", help="print one entry by id")
+    p.add_argument("bundle", type=Path)
+    p.add_argument("entry_id")
+
+    p = sub.add_parser("unpack", help="write a bundle back out as a canon directory")
+    p.add_argument("bundle", type=Path)
+    p.add_argument("dest", type=Path)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        stats = export_bundle(
+            args.canon_dir,
+            args.dest,
+            compression="none" if args.no_compress else "zstd",
+            level=args.level,
+            shard_size=args.shard_size << 20,
+            overwrite=args.overwrite,
+        )
+        print(f"Exported {stats.summary()} to {args.dest}.")
+        return
+
+    with BundleReader(args.bundle) as reader:
+        if args.command == "ls":
+            for entry in reader.entries():
+                print(f"{entry['id']}\t{entry['filename']}")
+        elif args.command == "cat":
+            try:
+                sys.stdout.write(reader.read(args.entry_id))
+            except KeyError:
+                parser.exit(1, f"No entry {args.entry_id} in {args.bundle}\n")
+        else:
+            n = reader.unpack(args.dest)
+            print(f"Unpacked {n} files to {args.dest}.")
+
+
+if __name__ == "__main__":
+    cli()
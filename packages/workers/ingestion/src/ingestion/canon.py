@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .config import settings
+from .models import CanonRef
+from .pipeline.digests import DigestSet, hash_key, url_key
+from .pipeline.index_log import INDEX_JSON, INDEX_LOG, iter_entries
+from .pipeline.minhash import LSHIndex, decode
+
+
+def canon_version(canon_dir: Path) -> str:
+    """Cheap content version of a canon's index files (mtime + size)."""
+    parts = []
+    for name in (INDEX_JSON, INDEX_LOG):
+        p = canon_dir / name
+        if p.exists():
+            st = p.stat()
+            parts.append(f"{st.st_mtime_ns:x}.{st.st_size:x}")
+        else:
+            parts.append("-")
+    return ":".join(parts)
+
+
+@dataclass(frozen=True)
+class CanonSnapshot:
+    """Read-only view of an existing canon's index, for deduplication.
+
+    Holds only what dedup needs — 64-bit keys of the content hashes and
+    source URLs (see ``pipeline.digests``) and, in near-duplicate mode, an LSH index of the
+    persisted MinHash signatures — never the full entries.
+    """
+
+    path: str
+    version: str
+    count: int
+    hashes: DigestSet
+    urls: DigestSet
+    near: LSHIndex | None = field(default=None, compare=False)
+    nbytes: int = field(default=0, compare=False)
+
+    def ref(self) -> CanonRef:
+        return CanonRef(path=self.path, version=self.version, entries=self.count)
+
+
+class CanonCache:
+    """Process-wide LRU cache of canon snapshots.
+
+    Keyed by resolved path and content version, so every session reading
+    an unchanged canon shares one parse; a changed canon is reloaded and
+    its stale snapshot dropped. Least recently used snapshots are evicted
+    once their estimated size exceeds *budget_bytes*.
+    """
+
+    def __init__(self, budget_bytes: int) -> None:
+        self.budget_bytes = budget_bytes
+        self.hits = 0
+        self.misses = 0
+        self._snapshots: OrderedDict[tuple[str, str], CanonSnapshot] = OrderedDict()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.nbytes for s in self._snapshots.values())
+
+    def get(self, path: str | Path) -> CanonSnapshot | None:
+        canon_dir = Path(path).resolve()
+        if not (canon_dir / INDEX_JSON).exists() and not (canon_dir / INDEX_LOG).exists():
+            return None
+
+        key = (str(canon_dir), canon_version(canon_dir))
+        if snapshot := self._snapshots.get(key):
+            self.hits += 1
+            self._snapshots.move_to_end(key)
+            return snapshot
+
+        self.misses += 1
+        snapshot = _load_snapshot(canon_dir, key[1])
+        for stale in [k for k in self._snapshots if k[0] == key[0]]:
+            del self._snapshots[stale]
+        self._snapshots[key] = snapshot
+        self._evict(keep=key)
+        return snapshot
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+
+    def _evict(self, keep: tuple[str, str]) -> None:
+        total = self.nbytes
+        for key in list(self._snapshots):
+            if total <= self.budget_bytes:
+                break
+            if key != keep:
+                total -= self._snapshots.pop(key).nbytes
+
+
+def _load_snapshot(canon_dir: Path, version: str) -> CanonSnapshot:
+    hashes: list[int] = []
+    urls: list[int] = []
+    near = None
+    if settings.near_dup_threshold:
+        near = LSHIndex(settings.near_dup_threshold, settings.minhash_perms)
+    count = 0
+    for record in iter_entries(canon_dir):
+        hashes.append(hash_key(record["content_hash"]))
+        urls.append(url_key(record["source_url"]))
+        if near is not None and record.get("minhash"):
+            near.add(decode(record["minhash"]))
+        count += 1
+    hashes_set, urls_set = DigestSet(hashes), DigestSet(urls)
+    nbytes = hashes_set.nbytes + urls_set.nbytes
+    if near is not None:
+        # Signature arrays plus one bucket slot per band.
+        nbytes += len(near) * (settings.minhash_perms * 4 + 64 + near.bands * 8)
+    return CanonSnapshot(
+        path=str(canon_dir),
+        version=version,
+        count=count,
+        hashes=hashes_set,
+        urls=urls_set,
+        near=near,
+        nbytes=nbytes,
+    )
+
+
+canon_cache = CanonCache(settings.canon_cache_budget_mb * 1024 * 1024)
+
+
+def open_canon(path: str | Path) -> CanonSnapshot | None:
+    """Shared snapshot of the canon at *path*, or None if it has no index."""
+    return canon_cache.get(path)
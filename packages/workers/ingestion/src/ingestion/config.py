@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Literal
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -16,6 +17,95 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8000
 
+    # Execution concurrency: global cap on sources running at once, plus
+    # per-SourceType limits. Set max_concurrent_sources=1 to run sequentially.
+    max_concurrent_sources: int = 8
+    source_concurrency: dict[str, int] = {
+        "web": 4,
+        "youtube": 2,
+        "rss": 8,
+        "epub": 2,
+        "text": 2,
+    }
+
+    # Session persistence: one JSON file per session, or a SQLite database
+    # with indexed listing columns (see `ingestion-migrate-sessions`).
+    session_backend: Literal["file", "sqlite"] = "file"
+
+    # Session cache: dirty sessions are written every flush interval
+    # (seconds); stage changes and shutdown flush immediately.
+    session_flush_interval: float = 1.0
+    session_cache_size: int = 256
+
+    # Boilerplate learning for web/RSS sources: lines found on more than
+    # this fraction of a site's pages are stripped once min_pages pages have
+    # been seen (None disables).
+    boilerplate_threshold: float | None = 0.5
+    boilerplate_min_pages: int = 5
+
+    # Section size limit for split documents, in words or in tokens of a
+    # local tiktoken encoding (requires the "tokens" extra).
+    split_max_size: int = 4000
+    split_counter: Literal["words", "tokens"] = "words"
+    split_encoding: str = "cl100k_base"
+
+    # Near-duplicate detection: MinHash/LSH over word shingles. Off unless a
+    # Jaccard threshold (e.g. 0.8) is set.
+    near_dup_threshold: float | None = None
+    minhash_perms: int = 128
+    shingle_size: int = 5
+
+    # Memory budget for the shared cache of existing-canon snapshots.
+    canon_cache_budget_mb: int = 256
+
+    # Keep a memory-mapped dedup index (dedup.idx) in each existing canon,
+    # shared by every session and process adding to it.
+    shared_dedup_index: bool = True
+
+    # Number of executions the job queue runs at once.
+    worker_pool_size: int = 2
+
+    # Log events kept in memory per execution for SSE subscribers; older
+    # events are replayed from the log file.
+    stream_buffer_size: int = 1000
+
+    # Canon writer thread: files queued before extraction waits, files per
+    # write batch, and fsync policy ("none", per-"batch", or once at the
+    # "final" flush).
+    write_queue_size: int = 256
+    write_batch_size: int = 64
+    write_durability: Literal["none", "batch", "final"] = "final"
+
+    # Store canon file bodies once under data_dir/blobs, keyed by SHA-256,
+    # and hardlink them into session output directories (see
+    # `ingestion-gc-blobs`).
+    blob_store: bool = True
+
+    # Conditional GETs for re-crawls: ETag/Last-Modified per URL are kept in
+    # data_dir/http_cache.db, and a 304 skips extraction.
+    http_cache: bool = True
+
+    # Crawl politeness per host: concurrency starts at crawl_host_concurrency
+    # and adapts (AIMD) up to crawl_host_max_concurrency, backing off on
+    # 429/5xx and when latency exceeds crawl_latency_factor x its baseline.
+    # Retry-After and robots.txt Crawl-delay are honoured up to
+    # crawl_max_delay seconds.
+    crawl_host_concurrency: int = 2
+    crawl_host_max_concurrency: int = 8
+    crawl_latency_factor: float = 3.0
+    crawl_max_delay: float = 30.0
+    crawl_respect_robots: bool = True
+
+    # Seed web crawls from robots.txt sitemaps and linked feeds; links are
+    # then only followed from the seed page.
+    crawl_discovery: bool = True
+
+    # HTML extraction process pool for the crawler: worker processes
+    # (None = CPU count, 0 = extract in a thread) and the maximum number of
+    # pages queued for extraction before the crawl waits.
+    extract_workers: int | None = None
+    extract_max_inflight: int | None = None
+
     model_config = {"env_prefix": "INGESTION_"}
 
 
@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+import fcntl
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .canon import canon_version
+from .pipeline.digests import hash_key, url_key
+from .pipeline.index_log import iter_entries
+
+INDEX_FILE = "dedup.idx"
+
+_MAGIC = b"INGDEDUP"
+# 2: URL keys are taken from canonical URLs.
+# 3: claims are stored apart from canon keys and expire.
+_FORMAT = 3
+# magic, format, retired flag, capacity, count, canon version (padded),
+# claim count, epoch.
+_HEADER = struct.Struct("<8sIIQQ64sQQ")
+_HEADER_SIZE = 128
+_MIN_CAPACITY = 1 << 12
+
+# URL keys are salted so they never coincide with content-hash keys, and
+# claimed keys so they never coincide with the canon's own.
+_URL_SALT = 0x9E3779B97F4A7C15
+_CLAIM_SALT = 0xC2B2AE3D27D4EB4F
+
+
+def _content_slot_key(content_hash: str) -> int:
+    return hash_key(content_hash) or 1  # 0 marks an empty slot
+
+
+def _url_slot_key(source_url: str) -> int:
+    return (url_key(source_url) ^ _URL_SALT) or 1
+
+
+def _claim_key(key: int) -> int:
+    return (key ^ _CLAIM_SALT) or 1
+
+
+class DedupIndex:
+    """Memory-mapped hash index of an existing canon, shared across processes.
+
+    Stores the 64-bit keys of every content hash and source URL in the
+    canon (see ``pipeline.digests``) in an open-addressing table in
+    ``<canon>/dedup.idx``, so opening it costs a stat and an mmap instead of
+    parsing the index. Lookups are lock-free.
+
+    Sessions adding to the canon from any process coordinate through
+    claims: ``claim`` checks and records a section's keys under an
+    exclusive ``flock``, so two running sessions never both write the same
+    text. Claims are salted apart from the canon's keys and only last while
+    their session runs: it ``release``-s them when it ends, and the first
+    process to open the index while no other has it open drops claims left
+    by crashed processes by rebuilding the table from the canon. Each
+    rebuild starts a new ``epoch``; a release naming an older epoch is
+    ignored, since its claim is already gone.
+
+    The table doubles by writing a new file and renaming it over the old
+    one, whose header is then marked retired; other processes notice and
+    remap. If the canon's index files have changed since the table was last
+    synced, their entries are re-inserted on open (inserts are idempotent).
+    """
+
+    def __init__(self, canon_dir: str | Path) -> None:
+        self.canon_dir = Path(canon_dir).resolve()
+        self.path = self.canon_dir / INDEX_FILE
+        self._lock_path = self.canon_dir / (INDEX_FILE + ".lock")
+        self._mm: mmap.mmap | None = None
+        self._slots: memoryview | None = None
+        self._capacity = 0
+
+        # Every process with the index open holds a shared lock on this
+        # file, so taking it exclusively proves no live process owns claims.
+        self._users = (self.canon_dir / (INDEX_FILE + ".users")).open("a")
+        with self._locked():
+            if not self._is_current_format():
+                self._build()
+            else:
+                self._map()
+                if self._header()[6] and _try_lock(self._users, fcntl.LOCK_EX):
+                    self._build()  # claims of crashed processes
+            fcntl.flock(self._users, fcntl.LOCK_SH)
+        self.sync()
+
+    def sync(self) -> None:
+        """Re-insert the canon's entries if its index files have changed."""
+        version = canon_version(self.canon_dir)
+        self._check_current()
+        if self._header()[5] == version.encode():
+            return
+        with self._locked():
+            self._check_current()
+            if self._header()[5] != version.encode():
+                self._insert_all(_canon_keys(self.canon_dir))
+                self._set_version(version)
+
+    # -- public API --------------------------------------------------------
+
+    def __len__(self) -> int:
+        """Number of keys, the canon's and claimed ones."""
+        self._check_current()
+        return self._header()[4]
+
+    @property
+    def claims(self) -> int:
+        """Number of claimed keys held by running sessions."""
+        self._check_current()
+        return self._header()[6]
+
+    @property
+    def epoch(self) -> int:
+        self._check_current()
+        return self._header()[7]
+
+    def contains_url(self, url: str, *, claims: bool = True) -> bool:
+        """Whether *url* is in the canon or, with *claims*, claimed."""
+        self._check_current()
+        key = _url_slot_key(url)
+        return self._find(key) or (claims and self._find(_claim_key(key)))
+
+    def contains(self, *, content_hash: str, source_url: str | None = None) -> bool:
+        """Whether the content (or *source_url*) is in the canon or claimed."""
+        self._check_current()
+        key = _content_slot_key(content_hash)
+        if self._find(key) or self._find(_claim_key(key)):
+            return True
+        return source_url is not None and self.contains_url(source_url)
+
+    def is_claimed(self, *, content_hash: str | None = None, source_url: str | None = None) -> bool:
+        """Whether the content or URL is claimed by a session, not in the canon."""
+        self._check_current()
+        for key in (
+            _content_slot_key(content_hash) if content_hash is not None else None,
+            _url_slot_key(source_url) if source_url is not None else None,
+        ):
+            if key is not None and not self._find(key) and self._find(_claim_key(key)):
+                return True
+        return False
+
+    def claim(
+        self, *, content_hash: str, source_url: str, check_url: bool = True
+    ) -> bool:
+        """Claim a section unless its content is known or claimed.
+
+        With *check_url*, the URL is checked and claimed too. Returns False
+        if already present. The check and insert are atomic across every
+        process sharing the index.
+        """
+        hkey = _content_slot_key(content_hash)
+        keys = [_claim_key(hkey)]
+        with self._locked():
+            self._check_current()
+            if self._find(hkey) or self._find(keys[0]):
+                return False
+            if check_url:
+                ukey = _url_slot_key(source_url)
+                if self._find(ukey) or self._find(_claim_key(ukey)):
+                    return False
+                keys.append(_claim_key(ukey))
+            self._add_claims(self._insert_all(keys))
+        return True
+
+    def release(
+        self,
+        *,
+        content_hash: str,
+        source_url: str | None = None,
+        epoch: int | None = None,
+    ) -> None:
+        """Withdraw a claim (and the URL's, if given).
+
+        Never removes the canon's own keys. With *epoch*, nothing is done
+        if the table has been rebuilt since, as the claim was dropped then
+        and the key may now be another session's.
+        """
+        hkey = _content_slot_key(content_hash)
+        keys = [_claim_key(hkey)]
+        if source_url is not None:
+            keys.append(_claim_key(_url_slot_key(source_url)))
+        with self._locked():
+            self._check_current()
+            if epoch is not None and epoch != self._header()[7]:
+                return
+            removed = sum(self._delete(key) for key in keys)
+            self._write_count(self._header()[4] - removed)
+            self._add_claims(-removed)
+
+    def close(self) -> None:
+        self._unmap()
+        if not self._users.closed:
+            self._users.close()  # drops the shared lock
+
+    # -- table -------------------------------------------------------------
+
+    def _find(self, key: int) -> bool:
+        slots, mask = self._slots, self._capacity - 1
+        i = key & mask
+        while True:
+            slot = slots[i]
+            if slot == key:
+                return True
+            if slot == 0:
+                return False
+            i = (i + 1) & mask
+
+    def _insert_all(self, keys: Iterable[int]) -> int:
+        """Insert keys; caller holds the lock. Returns how many were new."""
+        slots, mask = self._slots, self._capacity - 1
+        count = start = self._header()[4]
+        for key in keys:
+            if (count + 1) * 2 > self._capacity:
+                self._write_count(count)
+                self._grow()
+                slots, mask = self._slots, self._capacity - 1
+            i = key & mask
+            while True:
+                slot = slots[i]
+                if slot == key:
+                    break
+                if slot == 0:
+                    slots[i] = key
+                    count += 1
+                    break
+                i = (i + 1) & mask
+        self._write_count(count)
+        return count - start
+
+    def _delete(self, key: int) -> bool:
+        """Delete a key by backward shifting; caller holds the lock.
+
+        Entries only ever move to earlier slots of their probe sequence, so
+        lock-free readers never miss a key that stays in the table.
+        """
+        slots, mask = self._slots, self._capacity - 1
+        i = key & mask
+        while slots[i] != key:
+            if slots[i] == 0:
+                return False
+            i = (i + 1) & mask
+        j = i
+        while True:
+            j = (j + 1) & mask
+            slot = slots[j]
+            if slot == 0:
+                break
+            home = slot & mask
+            # Leave entries whose home lies cyclically in (i, j].
+            if (home - i - 1) & mask < (j - i) & mask:
+                continue
+            slots[i] = slot
+            i = j
+        slots[i] = 0
+        return True
+
+    def _grow(self) -> None:
+        capacity = self._capacity * 2
+        tmp = self.path.with_suffix(".idx.tmp")
+        _, _, _, _, _, version, claims, epoch = self._header()
+        self._create(tmp, capacity, version.decode(), claims=claims, epoch=epoch)
+        keys = [k for k in self._slots if k]
+        old_mm = self._mm
+
+        self._slots.release()
+        self._mm = _mmap(tmp)
+        self._capacity = capacity
+        self._slots = memoryview(self._mm)[_HEADER_SIZE:].cast("Q")
+        self._write_count(0)
+        self._insert_all(keys)
+        self._mm.flush()
+
+        os.replace(tmp, self.path)
+        # Tell processes still mapping the old file to remap.
+        struct.pack_into("<I", old_mm, 12, 1)
+        old_mm.close()
+
+    # -- file handling -----------------------------------------------------
+
+    def _is_current_format(self) -> bool:
+        try:
+            with self.path.open("rb") as fh:
+                magic, fmt, *_ = _HEADER.unpack(fh.read(_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        return magic == _MAGIC and fmt == _FORMAT
+
+    def _build(self) -> None:
+        """(Re)create the table from the canon; caller holds the lock.
+
+        Used on first use, after a format change and to drop claims left
+        by crashed processes. Starts a new epoch.
+        """
+        # Size the table for the whole canon up front.
+        keys = list(_canon_keys(self.canon_dir))
+        capacity = max(_MIN_CAPACITY, 1 << (len(keys) * 2).bit_length())
+        tmp = self.path.with_suffix(".idx.tmp")
+        epoch = int.from_bytes(os.urandom(8), "little")
+        self._create(tmp, capacity, "", epoch=epoch)
+        old_mm = self._mm
+        os.replace(tmp, self.path)
+        if old_mm is not None:
+            # Tell processes still mapping the old file to remap.
+            struct.pack_into("<I", old_mm, 12, 1)
+        self._map()
+        self._insert_all(keys)
+        self._set_version(canon_version(self.canon_dir))
+
+    @staticmethod
+    def _create(
+        path: Path, capacity: int, version: str, *, claims: int = 0, epoch: int = 0
+    ) -> None:
+        with path.open("wb") as fh:
+            fh.write(
+                _HEADER.pack(_MAGIC, _FORMAT, 0, capacity, 0, version.encode(), claims, epoch)
+            )
+            fh.truncate(_HEADER_SIZE + capacity * 8)
+
+    def _map(self) -> None:
+        self._unmap()
+        self._mm = _mmap(self.path)
+        magic, fmt, _, capacity, *_ = self._header()
+        if magic != _MAGIC or fmt != _FORMAT:
+            raise ValueError(f"Not a dedup index: {self.path}")
+        self._capacity = capacity
+        self._slots = memoryview(self._mm)[_HEADER_SIZE:].cast("Q")
+
+    def _unmap(self) -> None:
+        if self._slots is not None:
+            self._slots.release()
+            self._slots = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _check_current(self) -> None:
+        if self._header()[2]:  # retired by a resize in another process
+            self._map()
+
+    def _header(self) -> tuple:
+        magic, fmt, retired, capacity, count, version, claims, epoch = _HEADER.unpack_from(
+            self._mm, 0
+        )
+        return magic, fmt, retired, capacity, count, version.rstrip(b"\0"), claims, epoch
+
+    def _write_count(self, count: int) -> None:
+        struct.pack_into("<Q", self._mm, 24, count)
+
+    def _add_claims(self, n: int) -> None:
+        struct.pack_into("<Q", self._mm, 96, max(0, self._header()[6] + n))
+
+    def _set_version(self, version: str) -> None:
+        struct.pack_into("64s", self._mm, 32, version.encode())
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock_path.open("a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _try_lock(fh, operation: int) -> bool:
+    try:
+        fcntl.flock(fh, operation | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _mmap(path: Path) -> mmap.mmap:
+    # mmap keeps its own duplicate of the descriptor.
+    with path.open("r+b") as fh:
+        return mmap.mmap(fh.fileno(), 0)
+
+
+_indexes: dict[str, DedupIndex] = {}
+
+
+def open_dedup_index(canon_dir: str | Path) -> DedupIndex:
+    """The process-wide index for *canon_dir*, synced with its index files."""
+    key = str(Path(canon_dir).resolve())
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes[key] = DedupIndex(key)
+    else:
+        index.sync()
+    return index
+
+
+def close_all() -> None:
+    for index in _indexes.values():
+        index.close()
+    _indexes.clear()
+
+
+def _canon_keys(canon_dir: Path) -> Iterator[int]:
+    for record in iter_entries(canon_dir):
+        yield _content_slot_key(record["content_hash"])
+        yield _url_slot_key(record["source_url"])
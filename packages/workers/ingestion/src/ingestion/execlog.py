@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from .config import settings
+
+
+def log_path(session_id: str) -> Path:
+    d = settings.data_dir / "logs"
+    d.mkdir(parents=True, exist_ok=True)
+    return d / f"{session_id}.jsonl"
+
+
+class ExecutionLog:
+    """Append-only JSONL execution log for one session.
+
+    Each line is ``{"seq": n, "ts": "...", "msg": "..."}`` with ``seq``
+    starting at 1 and continuing across runs of the same session.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.seq = sum(1 for _ in read_log(path))
+        self._fh = path.open("a", encoding="utf-8")
+
+    @classmethod
+    def for_session(cls, session_id: str) -> ExecutionLog:
+        return cls(log_path(session_id))
+
+    def append(self, msg: str) -> int:
+        self.seq += 1
+        record = {
+            "seq": self.seq,
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "msg": msg,
+        }
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        return self.seq
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def read_log(path: Path | str | None, after: int = 0) -> Iterator[tuple[int, str]]:
+    """Yield ``(seq, msg)`` pairs from a log file, skipping ``seq <= after``."""
+    if path is None or not Path(path).exists():
+        return
+    with Path(path).open(encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn final line after a crash
+            if record["seq"] > after:
+                yield record["seq"], record["msg"]
@@ -1,105 +1,359 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime, timezone
+from contextlib import AsyncExitStack, suppress
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Awaitable, Callable
 
+from . import broadcast
 from .adapters import ADAPTERS
+from .canon import open_canon
 from .config import settings
-from .models import CanonIndex, Session, SessionStage
+from .dedup_index import DedupIndex, open_dedup_index
+from .execlog import ExecutionLog
+from .journal import Journal, journal_path, load_checkpoint
+from .models import ExtractedText, Session, SessionStage, Source
+from .pipeline.blobs import BlobStore
+from .pipeline.cleaner import BoilerplateLearner
 from .pipeline.dedup import Deduplicator
-from .pipeline.formatter import format_and_write
+from .pipeline.formatter import format_sections
+from .pipeline.index_log import IndexLog, iter_entries
+from .pipeline.splitter import TextCounter, make_counter
+from .pipeline.writer import CanonFile, CanonWriter
 from .session import store
 
-# Active execution streams: session_id → asyncio.Queue of log lines.
-_streams: dict[str, asyncio.Queue[str | None]] = {}
 
+@dataclass
+class _Limits:
+    """Semaphores bounding how many sources run at once."""
 
-def get_stream(session_id: str) -> asyncio.Queue[str | None] | None:
-    return _streams.get(session_id)
+    total: asyncio.Semaphore
+    per_type: dict[str, asyncio.Semaphore]
 
+    @classmethod
+    def from_settings(cls) -> _Limits:
+        return cls(
+            total=asyncio.Semaphore(max(1, settings.max_concurrent_sources)),
+            per_type={
+                name: asyncio.Semaphore(max(1, n))
+                for name, n in settings.source_concurrency.items()
+            },
+        )
 
-async def execute(session_id: str) -> None:
-    """Run ingestion for all sources in the session directly (no subprocess)."""
-    queue: asyncio.Queue[str | None] = asyncio.Queue()
-    _streams[session_id] = queue
+    def for_source(self, source: Source) -> list[asyncio.Semaphore]:
+        # Take the per-type slot first so a backlog of one type does not
+        # hold global slots that other types could use.
+        sems = [self.total]
+        if sem := self.per_type.get(source.type.value):
+            sems.insert(0, sem)
+        return sems
+
+
+@dataclass
+class _Run:
+    """State shared by all source tasks of one execution."""
+
+    log: Callable[[str], Awaitable[None]]
+    limits: _Limits
+    output_dir: Path
+    index: IndexLog
+    dedup: Deduplicator
+    writer: CanonWriter
+    journal: Journal
+    counter: TextCounter
+
+
+async def execute(session_id: str, *, resume: bool = False) -> None:
+    """Run ingestion for all sources in the session directly (no subprocess).
+
+    With *resume*, sources recorded as finished in the session's journal by
+    an interrupted run are skipped; files it wrote stay in ``index.jsonl``.
+    """
+    exec_log = ExecutionLog.for_session(session_id)
+    channel = broadcast.open_channel(session_id, exec_log.path, exec_log.seq)
+
+    def log_now(msg: str) -> None:
+        channel.publish(exec_log.append(msg), msg)
 
     async def log(msg: str) -> None:
+        log_now(msg)
+
+    loop = asyncio.get_running_loop()
+
+    def on_written(files: list[CanonFile]) -> None:
+        # Called on the writer thread; log on the event loop.
+        for file in files:
+            loop.call_soon_threadsafe(log_now, f"  [WROTE] {file.filename}")
+
+    def progress(written: int) -> None:
+        # Counters are persisted once per finished source, not per line.
         session = store.get(session_id)
         if session:
-            session.log.append(msg)
+            session.sources_done += 1
+            session.files_written += written
+            session.log_lines = exec_log.seq
             store.update(session)
-        await queue.put(msg)
 
+    async def run_one(source: Source, run: _Run) -> int:
+        written = await _run_source(source, run)
+        progress(written)
+        return written
+
+    journal: Journal | None = None
+    index: IndexLog | None = None
+    dedup: Deduplicator | None = None
+    writer: CanonWriter | None = None
     try:
         session = store.get(session_id)
         if not session:
             await log("[ERROR] Session not found")
             return
 
+        jpath = journal_path(session_id)
+        # Loaded even for a fresh run, for claims a crashed run left behind.
+        recovered = load_checkpoint(jpath)
+        checkpoint = recovered if resume else None
+        journal = Journal(jpath, reset=not resume)
+
         output_dir = settings.output_dir / session_id
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Load or create index.
-        index_path = output_dir / "index.json"
-        if index_path.exists():
-            index = CanonIndex.model_validate_json(index_path.read_text())
+        # Entries already in the output canon — including index.jsonl lines
+        # left by an interrupted run — are kept and seed the deduplicator.
+        index = IndexLog(output_dir, session.name)
+
+        pending = session.sources
+        session.log_path = str(exec_log.path)
+        if checkpoint is None:
+            session.sources_done = 0
+            session.files_written = 0
         else:
-            index = CanonIndex(agent_id=session.name)
+            # Counters persisted by the interrupted run are kept.
+            pending = [s for s in session.sources if s.id not in checkpoint.done_sources]
+            session.sources_done = len(session.sources) - len(pending)
+            await log(
+                f"[RESUME] {session.sources_done} sources already done, "
+                f"{index.count} entries in index"
+            )
+        store.update(session)
 
-        dedup = Deduplicator(session.existing_index or index)
+        base, shared = None, None
+        if session.canon_path:
+            shared = await _open_shared_index(session.canon_path, log)
+            # The snapshot is still needed for its MinHash LSH, or as the
+            # fallback when the canon directory is not writable.
+            if shared is None or settings.near_dup_threshold:
+                base = open_canon(session.canon_path)
+        dedup = Deduplicator(
+            base=base,
+            shared=shared,
+            near_threshold=settings.near_dup_threshold,
+            num_perm=settings.minhash_perms,
+            shingle_size=settings.shingle_size,
+            on_claim=journal.record_claim,
+        )
+        dedup.add_records(iter_entries(output_dir))
+        if shared is not None and recovered.claims:
+            released = _release_stale_claims(dedup, recovered.claims, output_dir, journal)
+            if released:
+                await log(f"[RESUME] {released} unwritten claims released from the shared index")
 
-        total_written = 0
+        writer = CanonWriter(
+            output_dir,
+            index,
+            durability=settings.write_durability,
+            max_pending=settings.write_queue_size,
+            batch_size=settings.write_batch_size,
+            on_written=on_written,
+            blobs=BlobStore(settings.data_dir / "blobs") if settings.blob_store else None,
+        )
+        run = _Run(
+            log=log,
+            limits=_Limits.from_settings(),
+            output_dir=output_dir,
+            index=index,
+            dedup=dedup,
+            writer=writer,
+            journal=journal,
+            counter=make_counter(settings.split_counter, settings.split_encoding),
+        )
+        counts = await asyncio.gather(*(run_one(source, run) for source in pending))
+        total_written = sum(counts)
+        stats = await writer.close()
+        await log(f"[WRITER] {stats.summary()} (durability: {settings.write_durability})")
 
-        for source in session.sources:
-            adapter_cls = ADAPTERS.get(source.type.value)
-            if adapter_cls is None:
-                await log(f"[SKIP] Unknown source type: {source.type}")
-                continue
+        # Claims only coordinate running sessions: this session's files are
+        # in its own output canon, not in the one the index describes.
+        _release_claims(dedup, journal)
 
-            await log(f"[SOURCE] {source.label or source.url}")
+        # Fold index.jsonl into index.json; the journal is then obsolete.
+        total_entries = index.compact()
+        journal.clear()
+        await log(f"\n[DONE] {total_written} files written, {total_entries} total entries")
 
-            try:
-                adapter = adapter_cls()
-                result = await adapter.extract(source)
+        _finish(session_id, SessionStage.DONE, exec_log)
 
-                for err in result.errors:
-                    await log(f"  [WARN] {err}")
+    except Exception as exc:
+        await log(f"[ERROR] {exc}")
+        _finish(session_id, SessionStage.ERROR, exec_log)
+    finally:
+        if writer is not None:
+            with suppress(Exception):  # already reported above
+                await writer.close()
+        if dedup is not None:
+            with suppress(Exception):  # a failed run's claims
+                _release_claims(dedup, journal)
+        broadcast.close_channel(session_id)  # signals end of stream
+        exec_log.close()
+        if journal is not None:
+            journal.close()
+        if index is not None:
+            index.close()
 
-                for extracted in result.texts:
-                    written = format_and_write(
-                        extracted,
-                        source_type=source.type,
-                        output_dir=output_dir,
-                        index=index,
-                        dedup=dedup,
-                    )
-                    for filename in written:
-                        await log(f"  [WROTE] {filename}")
-                        total_written += 1
 
-                if not result.texts and not result.errors:
-                    await log("  [WARN] No texts extracted")
+async def _open_shared_index(
+    canon_path: str, log: Callable[[str], Awaitable[None]]
+) -> DedupIndex | None:
+    if not settings.shared_dedup_index:
+        return None
+    try:
+        return open_dedup_index(canon_path)
+    except OSError as exc:
+        await log(f"[WARN] Shared dedup index unavailable, using in-memory snapshot: {exc}")
+        return None
 
-            except Exception as exc:
-                await log(f"  [ERROR] {exc}")
 
-        # Write final index.
-        index.updated = datetime.now(timezone.utc)
-        index_path.write_text(index.model_dump_json(indent=2))
-        await log(f"\n[DONE] {total_written} files written, {len(index.entries)} total entries")
+def _release_claims(dedup: Deduplicator, journal: Journal) -> None:
+    # Journaled, so a later run never releases a key another session has
+    # claimed since.
+    for content_hash in dedup.release_claims():
+        journal.record_release(content_hash)
 
-        session = store.get(session_id)
-        if session:
-            session.stage = SessionStage.DONE
-            store.update(session)
 
-    except Exception as exc:
-        await log(f"[ERROR] {exc}")
-        session = store.get(session_id)
-        if session:
-            session.stage = SessionStage.ERROR
-            store.update(session)
-    finally:
-        await queue.put(None)  # sentinel — signals end of stream
-        _streams.pop(session_id, None)
+def _release_stale_claims(
+    dedup: Deduplicator,
+    claims: dict[str, tuple[str | None, int | None]],
+    output_dir: Path,
+    journal: Journal,
+) -> int:
+    """Settle journaled claims of an earlier, interrupted run.
+
+    Claims whose files are in the output canon are held again until this
+    run ends; the rest are released. Returns how many were released.
+    """
+    hashes: set[str] = set()
+    urls: set[str] = set()
+    for record in iter_entries(output_dir):
+        hashes.add(record["content_hash"].removeprefix("sha256:"))
+        urls.add(record["source_url"])
+    released = 0
+    for content_hash, (url, epoch) in claims.items():
+        if content_hash in hashes:
+            dedup.hold(content_hash=content_hash, source_url=url, epoch=epoch)
+            continue
+        dedup.release(
+            content_hash=content_hash,
+            source_url=url if url not in urls else None,
+            epoch=epoch,
+        )
+        journal.record_release(content_hash)
+        released += 1
+    return released
+
+
+def _finish(session_id: str, stage: SessionStage, exec_log: ExecutionLog) -> None:
+    session = store.get(session_id)
+    if session:
+        session.stage = stage
+        session.log_lines = exec_log.seq
+        store.update(session)
+
+
+async def _run_source(source: Source, run: _Run) -> int:
+    """Extract one source and write its texts; returns the number of files.
+
+    The source is marked done in the journal only if it ran to completion,
+    so a resumed execution retries sources that failed or were interrupted.
+    """
+    log = run.log
+    adapter_cls = ADAPTERS.get(source.type.value)
+    if adapter_cls is None:
+        await log(f"[SKIP] Unknown source type: {source.type}")
+        return 0
+
+    label = source.label or source.url
+    written_count = 0
+
+    async with AsyncExitStack() as stack:
+        for sem in run.limits.for_source(source):
+            await stack.enter_async_context(sem)
+
+        await log(f"[SOURCE] {label}")
+
+        # Web pages and feed articles share site chrome worth learning.
+        learner = None
+        if settings.boilerplate_threshold and source.type.value in ("web", "rss"):
+            learner = BoilerplateLearner(
+                settings.boilerplate_threshold, settings.boilerplate_min_pages
+            )
+
+        async def write(text: ExtractedText) -> None:
+            nonlocal written_count
+            # format_sections is synchronous, so the dedup check, claim and
+            # id reservation for one text cannot interleave with another
+            # source's — no extra locking is needed. Files are then queued
+            # for the writer thread.
+            skips = run.dedup.claimed_skips
+            files = format_sections(
+                text,
+                source_type=source.type,
+                index=run.index,
+                dedup=run.dedup,
+                max_size=settings.split_max_size,
+                counter=run.counter,
+            )
+            if run.dedup.claimed_skips != skips:
+                await log(f"  [SKIP] {text.source_url}: claimed by another running session")
+            for file in files:
+                await run.writer.put(file)
+                written_count += 1
+
+        try:
+            # Pages claimed by another running session are still fetched,
+            # so the skip is logged when the text reaches format_sections.
+            adapter = adapter_cls(
+                is_known=lambda url: run.dedup.is_known_url(url, claims=False)
+            )
+            produced = False
+
+            # Each text is formatted and written as soon as the adapter
+            # yields it (or, for the first pages of a site, once the
+            # boilerplate learner has warmed up), so peak memory stays small.
+            async for item in adapter.extract_stream(source):
+                produced = True
+                if isinstance(item, str):
+                    await log(f"  [WARN] {item}")
+                    continue
+                for text in learner.feed(item) if learner else [item]:
+                    await write(text)
+
+            if learner:
+                for text in learner.flush():
+                    await write(text)
+                if learner.lines_removed:
+                    await log(f"  [CLEAN] {learner.lines_removed} repeated boilerplate lines removed")
+
+            if not produced:
+                await log("  [WARN] No texts extracted")
+
+            # Only mark the source done once its files are on disk.
+            await run.writer.barrier()
+            run.journal.record_source_done(source.id, written_count)
+
+        except Exception as exc:
+            await log(f"  [ERROR] {exc}")
+
+        await log(f"[SOURCE DONE] {label} ({written_count} files)")
+
+    return written_count
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from .config import settings
+
+
+class CacheEntry(NamedTuple):
+    etag: str | None
+    last_modified: str | None
+    # What the adapter learned from the last full response (links found,
+    # feed entries, whether text was extracted), replayed on a 304.
+    data: dict[str, Any]
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    """ETag/Last-Modified validators per URL in ``data/http_cache.db``.
+
+    Adapters send the stored validators as a conditional GET; a ``304 Not
+    Modified`` means the body is unchanged, so extraction is skipped and
+    the stored ``data`` stands in for it. Bodies themselves are not cached.
+    Safe to share between threads.
+    """
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS http_cache (
+        url           TEXT PRIMARY KEY,
+        etag          TEXT,
+        last_modified TEXT,
+        data          TEXT NOT NULL,
+        fetched_at    REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            path = self.path or settings.data_dir / "http_cache.db"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self._SCHEMA)
+        return self._conn
+
+    def get(self, url: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, data FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(row[0], row[1], json.loads(row[2]))
+
+    def store(
+        self,
+        url: str,
+        *,
+        etag: str | None,
+        last_modified: str | None,
+        data: dict[str, Any] | None = None,
+    ) -> None:
+        """Record a full response; responses without validators are forgotten."""
+        with self._lock:
+            if not etag and not last_modified:
+                self._db.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO http_cache "
+                "(url, etag, last_modified, data, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(data or {}), time.time()),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+http_cache = HTTPCache()
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import executor
+from .config import settings
+from .models import Job, JobState, SessionStage
+from .session import store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    session_id  TEXT NOT NULL,
+    priority    INTEGER NOT NULL DEFAULT 0,
+    resume      INTEGER NOT NULL DEFAULT 0,
+    state       TEXT NOT NULL,
+    error       TEXT,
+    created_at  TEXT NOT NULL,
+    started_at  TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id);
+"""
+
+_COLUMNS = "id, session_id, priority, resume, state, error, created_at, started_at, finished_at"
+
+
+class JobQueue:
+    """SQLite-backed persistent queue of session executions.
+
+    Jobs are claimed highest priority first, then oldest first. Jobs left
+    ``RUNNING`` by a dead process are re-queued as resumes on startup.
+    """
+
+    def __init__(self) -> None:
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            settings.data_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                Path(settings.data_dir) / "jobs.db", isolation_level=None
+            )
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    # -- producer side ------------------------------------------------------
+
+    def enqueue(self, session_id: str, *, priority: int = 0, resume: bool = False) -> Job:
+        job = Job(session_id=session_id, priority=priority, resume=resume)
+        self._db.execute(
+            f"INSERT INTO jobs ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            _to_row(job),
+        )
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        row = self._db.execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return _from_row(row) if row else None
+
+    def list_all(
+        self,
+        *,
+        state: JobState | None = None,
+        session_id: str | None = None,
+        limit: int = 100,
+    ) -> list[Job]:
+        clauses, params = [], []
+        if state is not None:
+            clauses.append("state = ?")
+            params.append(state.value)
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._db.execute(
+            f"SELECT {_COLUMNS} FROM jobs {where} "
+            f"ORDER BY created_at DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [_from_row(r) for r in rows]
+
+    def active_for_session(self, session_id: str) -> Job | None:
+        row = self._db.execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE session_id = ? AND state IN (?, ?)",
+            (session_id, JobState.QUEUED.value, JobState.RUNNING.value),
+        ).fetchone()
+        return _from_row(row) if row else None
+
+    # -- worker side --------------------------------------------------------
+
+    def claim(self) -> Job | None:
+        """Atomically move the next queued job to ``RUNNING``."""
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE state = ? "
+                f"ORDER BY priority DESC, created_at LIMIT 1",
+                (JobState.QUEUED.value,),
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            job = _from_row(row)
+            job.state = JobState.RUNNING
+            job.started_at = _now()
+            db.execute(
+                "UPDATE jobs SET state = ?, started_at = ? WHERE id = ?",
+                (job.state.value, job.started_at.isoformat(), job.id),
+            )
+            db.execute("COMMIT")
+            return job
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def finish(self, job_id: str, state: JobState, error: str | None = None) -> None:
+        self._db.execute(
+            "UPDATE jobs SET state = ?, error = ?, finished_at = ? WHERE id = ?",
+            (state.value, error, _now().isoformat(), job_id),
+        )
+
+    def requeue_interrupted(self) -> int:
+        """Re-queue jobs a previous process left running, as resumes."""
+        cur = self._db.execute(
+            "UPDATE jobs SET state = ?, resume = 1, started_at = NULL WHERE state = ?",
+            (JobState.QUEUED.value, JobState.RUNNING.value),
+        )
+        return cur.rowcount
+
+
+class WorkerPool:
+    """A fixed number of asyncio workers draining the job queue."""
+
+    def __init__(self, queue: JobQueue) -> None:
+        self.queue = queue
+        self._wake = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self, size: int) -> None:
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(max(1, size))
+        ]
+
+    async def stop(self) -> None:
+        # Running jobs stay RUNNING in the database and are resumed on the
+        # next start by requeue_interrupted().
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job has been enqueued."""
+        self._wake.set()
+
+    async def _worker(self) -> None:
+        while True:
+            job = self.queue.claim()
+            if job is None:
+                # claim() does not await, so no enqueue can slip in between
+                # the empty claim and clearing the event.
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            try:
+                await executor.execute(job.session_id, resume=job.resume)
+            except Exception as exc:
+                self.queue.finish(job.id, JobState.ERROR, str(exc))
+                continue
+
+            session = store.get(job.session_id)
+            if session and session.stage == SessionStage.DONE:
+                self.queue.finish(job.id, JobState.DONE)
+            else:
+                self.queue.finish(job.id, JobState.ERROR, "Execution failed; see session log")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _to_row(job: Job) -> tuple:
+    return (
+        job.id,
+        job.session_id,
+        job.priority,
+        int(job.resume),
+        job.state.value,
+        job.error,
+        job.created_at.isoformat(),
+        job.started_at.isoformat() if job.started_at else None,
+        job.finished_at.isoformat() if job.finished_at else None,
+    )
+
+
+def _from_row(row: sqlite3.Row) -> Job:
+    return Job.model_validate({**dict(row), "resume": bool(row["resume"])})
+
+
+job_queue = JobQueue()
+pool = WorkerPool(job_queue)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .config import settings
+
+
+def journal_path(session_id: str) -> Path:
+    d = settings.data_dir / "journals"
+    d.mkdir(parents=True, exist_ok=True)
+    return d / f"{session_id}.jsonl"
+
+
+@dataclass
+class Checkpoint:
+    """Progress recovered from a journal.
+
+    The sources that finished, and every shared-index claim made and not
+    since released (content hash -> URL claimed with it and the index's
+    epoch), whether or not its file was written.
+    """
+
+    done_sources: set[str] = field(default_factory=set)
+    claims: dict[str, tuple[str | None, int | None]] = field(default_factory=dict)
+
+
+class Journal:
+    """Append-only progress journal for one execution.
+
+    Records every finished source as it happens. Written files are
+    recorded by the canon's own ``index.jsonl`` (see ``IndexLog``), so
+    together they let an interrupted execution resume without redoing
+    finished work. Claims made in a shared dedup index are recorded, and
+    so are their releases, so a run after a crash can release the claims
+    it left behind.
+    """
+
+    def __init__(self, path: Path, *, reset: bool = False) -> None:
+        self.path = path
+        self._fh = path.open("w" if reset else "a", encoding="utf-8")
+
+    def record_source_done(self, source_id: str, written: int) -> None:
+        self._write({"type": "source_done", "source_id": source_id, "written": written})
+
+    def record_claim(self, content_hash: str, source_url: str | None, epoch: int) -> None:
+        self._write(
+            {
+                "type": "claim",
+                "content_hash": content_hash,
+                "source_url": source_url,
+                "epoch": epoch,
+            }
+        )
+
+    def record_release(self, content_hash: str) -> None:
+        self._write({"type": "release", "content_hash": content_hash})
+
+    def clear(self) -> None:
+        """Drop all records once the index has been compacted."""
+        self._fh.truncate(0)
+        self._fh.seek(0)
+
+    def close(self) -> None:
+        self._fh.close()
+
+    def _write(self, record: dict) -> None:
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._fh.flush()
+
+
+def load_checkpoint(path: Path) -> Checkpoint:
+    checkpoint = Checkpoint()
+    if not path.exists():
+        return checkpoint
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn final line after a crash
+            if record["type"] == "source_done":
+                checkpoint.done_sources.add(record["source_id"])
+            elif record["type"] == "claim":
+                checkpoint.claims[record["content_hash"]] = (
+                    record["source_url"],
+                    record.get("epoch"),
+                )
+            elif record["type"] == "release":
+                checkpoint.claims.pop(record["content_hash"], None)
+    return checkpoint
@@ -4,8 +4,13 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .adapters.extraction import extractor
 from .config import settings
+from .dedup_index import close_all as close_dedup_indexes
+from .http_cache import http_cache
+from .jobs import job_queue, pool
 from .router import router
+from .session import store
 
 
 @asynccontextmanager
@@ -13,7 +18,15 @@ async def lifespan(_app: FastAPI):
     settings.data_dir.mkdir(parents=True, exist_ok=True)
     (settings.data_dir / "sessions").mkdir(parents=True, exist_ok=True)
     settings.output_dir.mkdir(parents=True, exist_ok=True)
+    store.start(settings.session_flush_interval)
+    job_queue.requeue_interrupted()
+    pool.start(settings.worker_pool_size)
     yield
+    await pool.stop()
+    extractor.shutdown()
+    close_dedup_indexes()
+    http_cache.close()
+    await store.stop()
 
 
 app = FastAPI(title="Bibliotalk Ingestion Worker", lifespan=lifespan)
@@ -0,0 +1,40 @@
+"""Copy sessions from the JSON file backend into the SQLite backend.
+
+Usage: ``ingestion-migrate-sessions [--overwrite]``
+"""
+from __future__ import annotations
+
+import argparse
+
+from .session import FileSessionBackend, SQLiteSessionBackend
+
+
+def migrate(*, overwrite: bool = False) -> tuple[int, int]:
+    """Return ``(copied, skipped)`` session counts."""
+    source = FileSessionBackend()
+    target = SQLiteSessionBackend()
+    copied = skipped = 0
+    for session in source.iter_all():
+        if not overwrite and target.load(session.id) is not None:
+            skipped += 1
+            continue
+        target.save(session)
+        copied += 1
+    return copied, skipped
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="replace sessions that already exist in the SQLite database",
+    )
+    args = parser.parse_args()
+    copied, skipped = migrate(overwrite=args.overwrite)
+    print(f"Migrated {copied} sessions ({skipped} already present).")
+    print("Set INGESTION_SESSION_BACKEND=sqlite to use the SQLite backend.")
+
+
+if __name__ == "__main__":
+    cli()
@@ -36,6 +36,13 @@ class SessionStage(str, Enum):
     ERROR = "ERROR"
 
 
+class JobState(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    ERROR = "ERROR"
+
+
 # ---------------------------------------------------------------------------
 # Source
 # ---------------------------------------------------------------------------
@@ -61,6 +68,8 @@ class IndexEntry(BaseModel):
     content_hash: str
     word_count: int
     ingested_at: datetime = Field(default_factory=_now)
+    # Base64 MinHash signature, present when near-duplicate detection is on.
+    minhash: str | None = None
 
 
 class CanonIndex(BaseModel):
@@ -70,6 +79,14 @@ class CanonIndex(BaseModel):
     entries: list[IndexEntry] = []
 
 
+class CanonRef(BaseModel):
+    """Reference to an existing canon by path and content version."""
+
+    path: str
+    version: str
+    entries: int = 0
+
+
 # ---------------------------------------------------------------------------
 # Extraction primitives (used by adapters & pipeline)
 # ---------------------------------------------------------------------------
@@ -99,12 +116,56 @@ class Session(BaseModel):
     stage: SessionStage = SessionStage.INIT
     sources: list[Source] = []
     plan: str = ""
-    existing_index: CanonIndex | None = None
-    log: list[str] = []
+    existing_canon: CanonRef | None = None
+    # Execution log lives in an append-only JSONL file (see execlog.py);
+    # the session only keeps a pointer and progress counters.
+    log_path: str | None = None
+    log_lines: int = 0
+    sources_done: int = 0
+    files_written: int = 0
     created_at: datetime = Field(default_factory=_now)
     updated_at: datetime = Field(default_factory=_now)
 
 
+class SessionSummary(BaseModel):
+    """Indexed session fields, as returned by session listings."""
+
+    id: str
+    name: str
+    stage: SessionStage
+    created_at: datetime
+    updated_at: datetime
+
+
+class SessionPage(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    items: list[SessionSummary]
+
+
+class SessionDetail(Session):
+    """Session with its execution log, as returned by ``GET /sessions/{id}``."""
+
+    log: list[str] = []
+
+
+# ---------------------------------------------------------------------------
+# Execution jobs
+# ---------------------------------------------------------------------------
+
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: f"job_{_short_id()}")
+    session_id: str
+    priority: int = 0
+    resume: bool = False
+    state: JobState = JobState.QUEUED
+    error: str | None = None
+    created_at: datetime = Field(default_factory=_now)
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
 # ---------------------------------------------------------------------------
 # Request / Response helpers
 # ---------------------------------------------------------------------------
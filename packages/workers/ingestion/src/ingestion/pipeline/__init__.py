@@ -1,6 +1,21 @@
-from .cleaner import clean_text
+from .blobs import BlobStore
+from .cleaner import BoilerplateLearner, clean_text
 from .dedup import Deduplicator
-from .formatter import format_and_write
+from .formatter import format_and_write, format_sections
+from .index_log import IndexLog, iter_entries
 from .splitter import split_text
+from .writer import CanonFile, CanonWriter
 
-__all__ = ["clean_text", "split_text", "format_and_write", "Deduplicator"]
+__all__ = [
+    "clean_text",
+    "BoilerplateLearner",
+    "split_text",
+    "format_and_write",
+    "format_sections",
+    "CanonFile",
+    "CanonWriter",
+    "BlobStore",
+    "Deduplicator",
+    "IndexLog",
+    "iter_entries",
+]
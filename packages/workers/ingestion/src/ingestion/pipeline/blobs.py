@@ -0,0 +1,138 @@
+"""Content-addressed store for canon file bodies.
+
+Usage: ``ingestion-gc-blobs [--min-age SECONDS] [--dry-run]``
+"""
+from __future__ import annotations
+
+import argparse
+import errno
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+# Hardlinking fails across filesystems, where the filesystem does not
+# support it, or past the per-inode link limit; the file is copied instead.
+_NO_LINK = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+
+class BlobStore:
+    """Files stored once under ``<root>/<ab>/<sha256>``, keyed by their bytes.
+
+    Canon files in session output directories are hardlinks to their blob,
+    so re-ingesting the same content costs a directory entry rather than a
+    second copy. Blobs are immutable: never edit an output file in place.
+    Blobs no longer linked from any output directory are removed by
+    ``collect``.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, data: bytes, *, fsync: bool = False) -> tuple[Path, bool]:
+        """Store *data*; return its blob path and whether it was new.
+
+        A reused blob's mtime is refreshed so ``collect`` keeps it until
+        the caller has linked it.
+        """
+        path = self.path_for(hashlib.sha256(data).hexdigest())
+        try:
+            os.utime(path)
+            return path, False
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp.open("wb") as fh:
+            fh.write(data)
+            if fsync:
+                fh.flush()
+                os.fsync(fh.fileno())
+        # Identical bytes, so a concurrent writer of the same blob is harmless.
+        os.replace(tmp, path)
+        return path, True
+
+    def link(
+        self, blob: Path, dest: Path, *, data: bytes | None = None, fsync: bool = False
+    ) -> bool:
+        """Point *dest* at *blob*, replacing any existing file.
+
+        If *blob* was collected in the meantime and its *data* is given, it
+        is stored again and linked. Returns False if the blob had to be
+        copied instead of linked.
+        """
+        tmp = dest.with_name(f".{dest.name}.{threading.get_ident()}.tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            try:
+                os.link(blob, tmp)
+            except FileNotFoundError:
+                if data is None:
+                    raise
+                blob, _ = self.put(data, fsync=fsync)
+                os.link(blob, tmp)
+            linked = True
+        except OSError as exc:
+            if exc.errno not in _NO_LINK:
+                raise
+            tmp.write_bytes(blob.read_bytes())
+            linked = False
+        os.replace(tmp, dest)
+        return linked
+
+    def iter_blobs(self) -> Iterator[Path]:
+        if not self.root.exists():
+            return
+        for sub in self.root.iterdir():
+            if sub.is_dir():
+                yield from sub.iterdir()
+
+    def collect(self, *, min_age: float = 3600.0, dry_run: bool = False) -> tuple[int, int]:
+        """Remove blobs no output directory links to.
+
+        Blobs (and leftover temp files) modified less than *min_age* seconds
+        ago are kept, since a running writer links a new blob just after
+        storing it. Returns ``(files, bytes)`` removed.
+        """
+        cutoff = time.time() - min_age
+        files = size = 0
+        for path in self.iter_blobs():
+            st = path.stat()
+            if st.st_nlink > 1 or st.st_mtime > cutoff:
+                continue
+            if not dry_run:
+                path.unlink(missing_ok=True)
+            files += 1
+            size += st.st_size
+        return files, size
+
+
+def cli() -> None:
+    from ..config import settings
+
+    parser = argparse.ArgumentParser(description="Remove unreferenced canon blobs.")
+    parser.add_argument(
+        "--min-age",
+        type=float,
+        default=3600.0,
+        help="keep blobs modified within this many seconds (default: 3600)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="report what would be removed without deleting anything",
+    )
+    args = parser.parse_args()
+    store = BlobStore(settings.data_dir / "blobs")
+    files, size = store.collect(min_age=args.min_age, dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"{verb} {files} blobs ({size / 1024 / 1024:.1f} MiB) from {store.root}.")
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,32 +1,118 @@
 from __future__ import annotations
 
 import re
+from collections import Counter
+from urllib.parse import urlsplit
+
+from ..models import ExtractedText
+
+# Common web boilerplate lines, as one multiline pattern so each document
+# is scanned once. A matching line is removed along with its newline.
+# Line breaks are first normalised to "\n" (the ones str.splitlines knows),
+# so [^\S\n] is exactly the whitespace str.strip removes from a line.
+_LINE_BREAKS = re.compile(r"\r\n?|[\v\f\x1c-\x1e\x85\u2028\u2029]")
+_BOILERPLATE_RULES = [
+    r"(?:share|tweet|pin|email|print|subscribe|follow us|related posts?).*",
+    r"(?:cookie|privacy|terms of service|copyright ©).*",
+    r"(?:advertisement|sponsored|promoted).*",
+    r"\[?[^\S\n]*(?:menu|navigation|sidebar|footer|header)[^\S\n]*\]?",
+]
+_BOILERPLATE = re.compile(
+    r"^[^\S\n]*(?:" + "|".join(_BOILERPLATE_RULES) + r")[^\S\n]*(?:\n|$)",
+    re.IGNORECASE | re.MULTILINE,
+)
+_BLANK_RUNS = re.compile(r"\n{3,}")
+_TRAILING_SPACE = re.compile(r"[ \t]+\n")
+_HAS_WORD = re.compile(r"\w")
 
 
 def clean_text(text: str) -> str:
     """Strip boilerplate, normalize whitespace, and tidy up extracted text."""
-    # Remove common web boilerplate markers.
-    patterns = [
-        r"(?i)^(share|tweet|pin|email|print|subscribe|follow us|related posts?).*$",
-        r"(?i)^(cookie|privacy|terms of service|copyright ©).*$",
-        r"(?i)^(advertisement|sponsored|promoted).*$",
-        r"(?i)^\[?\s*(menu|navigation|sidebar|footer|header)\s*\]?$",
-    ]
-    lines = text.splitlines()
-    cleaned: list[str] = []
-    for line in lines:
-        stripped = line.strip()
-        if any(re.match(p, stripped) for p in patterns):
-            continue
-        cleaned.append(line)
-
-    result = "\n".join(cleaned)
+    result = _BOILERPLATE.sub("", _LINE_BREAKS.sub("\n", text))
 
     # Collapse runs of 3+ blank lines into 2.
-    result = re.sub(r"\n{3,}", "\n\n", result)
+    result = _BLANK_RUNS.sub("\n\n", result)
 
     # Normalize non-breaking spaces and other whitespace oddities.
     result = result.replace("\u00a0", " ")
-    result = re.sub(r"[ \t]+\n", "\n", result)  # trailing spaces
+    result = _TRAILING_SPACE.sub("\n", result)  # trailing spaces
 
     return result.strip()
+
+
+def _line_key(line: str) -> int | None:
+    """Hash of a line for frequency counting, or None for structural lines."""
+    line = " ".join(line.split()).lower()
+    if not _HAS_WORD.search(line):
+        return None  # blank lines, rules, fences
+    return hash(line)
+
+
+class _DomainStats:
+    __slots__ = ("pages", "lines")
+
+    def __init__(self) -> None:
+        self.pages = 0
+        self.lines: Counter[int] = Counter()
+
+
+class BoilerplateLearner:
+    """Learn site chrome from repeated lines and strip it from pages.
+
+    Counts, per domain, how many pages each line appears on. Once a domain
+    has *min_pages* pages, lines seen on more than *threshold* of them
+    (author bios, newsletter plugs, nav text) are removed from its texts.
+    The first *min_pages* texts of a domain are held back until then, so
+    they are cleaned with the learned lines too.
+    """
+
+    # Prune lines seen only once when a domain tracks more than this.
+    _MAX_LINES = 200_000
+
+    def __init__(self, threshold: float = 0.5, min_pages: int = 5) -> None:
+        self.threshold = threshold
+        self.min_pages = max(2, min_pages)
+        self.lines_removed = 0
+        self._domains: dict[str, _DomainStats] = {}
+        self._pending: dict[str, list[ExtractedText]] = {}
+
+    def feed(self, text: ExtractedText) -> list[ExtractedText]:
+        """Observe *text*; return the texts that are ready to write."""
+        domain = (urlsplit(text.source_url).hostname or "").removeprefix("www.")
+        stats = self._domains.setdefault(domain, _DomainStats())
+        self._observe(stats, text.body)
+
+        if stats.pages < self.min_pages:
+            self._pending.setdefault(domain, []).append(text)
+            return []
+        ready = self._pending.pop(domain, [])
+        ready.append(text)
+        return [self._strip(stats, t) for t in ready]
+
+    def flush(self) -> list[ExtractedText]:
+        """Release texts still held back (domains that never warmed up)."""
+        ready = [t for texts in self._pending.values() for t in texts]
+        self._pending.clear()
+        return ready
+
+    def _observe(self, stats: _DomainStats, body: str) -> None:
+        stats.pages += 1
+        keys = {k for line in body.splitlines() if (k := _line_key(line)) is not None}
+        stats.lines.update(keys)
+        if len(stats.lines) > self._MAX_LINES:
+            stats.lines = Counter({k: n for k, n in stats.lines.items() if n > 1})
+
+    def _strip(self, stats: _DomainStats, text: ExtractedText) -> ExtractedText:
+        cutoff = self.threshold * stats.pages
+        kept: list[str] = []
+        removed = 0
+        for line in text.body.splitlines():
+            key = _line_key(line)
+            if key is not None and stats.lines[key] > cutoff:
+                removed += 1
+            else:
+                kept.append(line)
+        if not removed:
+            return text
+        self.lines_removed += removed
+        return text.model_copy(update={"body": "\n".join(kept)})
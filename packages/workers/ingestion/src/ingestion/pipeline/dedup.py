@@ -2,8 +2,16 @@ from __future__ import annotations
 
 import hashlib
 import re
+from array import array
+from typing import TYPE_CHECKING, Callable, Iterable, Mapping
 
-from ..models import CanonIndex
+from ..models import CanonIndex, IndexEntry
+from .digests import DigestSet, hash_key, url_key
+from .minhash import LSHIndex, MinHasher, decode
+
+if TYPE_CHECKING:
+    from ..canon import CanonSnapshot
+    from ..dedup_index import DedupIndex
 
 
 def normalize(text: str) -> str:
@@ -19,29 +27,168 @@ def compute_hash(text: str) -> str:
 
 
 class Deduplicator:
-    """Track seen content hashes and source URLs for deduplication."""
+    """Track seen content hashes and source URLs for deduplication.
+
+    URLs are compared in canonical form (see ``canonicalize_url``). Both
+    are kept as 64-bit keys in compact ``DigestSet``s rather than as
+    strings, so memory stays around 8 bytes per entry per set.
+
+    An optional read-only *base* snapshot (an existing canon, shared with
+    other sessions) is consulted but never copied or modified. A *shared*
+    on-disk ``DedupIndex`` additionally coordinates with other processes
+    adding to the same canon: texts are ``claim``-ed before being written,
+    and the claims are held until ``release_claims`` at the end of the run.
+    *on_claim* is called after each successful claim, with the index's
+    epoch, so a journal can record it and a run after a crash can
+    ``release`` or ``hold`` it. ``claimed_skips`` counts texts dropped only
+    because another running session claimed them.
 
-    def __init__(self, existing_index: CanonIndex | None = None) -> None:
-        self._hashes: set[str] = set()
-        self._urls: set[str] = set()
+    With *near_threshold* set, sections are also compared by MinHash
+    signature, and anything whose estimated Jaccard similarity to a seen
+    section reaches the threshold counts as a near-duplicate.
+    """
+
+    def __init__(
+        self,
+        existing_index: CanonIndex | None = None,
+        *,
+        base: CanonSnapshot | None = None,
+        shared: DedupIndex | None = None,
+        near_threshold: float | None = None,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        on_claim: Callable[[str, str | None, int], None] | None = None,
+    ) -> None:
+        self._base = base
+        self._shared = shared
+        self._on_claim = on_claim
+        # Claims held by this run: content hash -> (URL claimed with it, epoch).
+        self._claims: dict[str, tuple[str | None, int | None]] = {}
+        self.claimed_skips = 0
+        self._hashes = DigestSet()
+        self._urls = DigestSet()
+        self._hasher: MinHasher | None = None
+        self._near: LSHIndex | None = None
+        if near_threshold:
+            self._hasher = MinHasher(num_perm, shingle_size)
+            self._near = LSHIndex(near_threshold, num_perm)
 
         if existing_index:
-            for entry in existing_index.entries:
-                # Strip the "sha256:" prefix if present.
-                h = entry.content_hash
-                if h.startswith("sha256:"):
-                    h = h[7:]
-                self._hashes.add(h)
-                self._urls.add(entry.source_url)
+            self.add_entries(existing_index.entries)
+
+    def add_entries(self, entries: Iterable[IndexEntry]) -> None:
+        fields = {"content_hash", "source_url", "minhash"}
+        self.add_records(entry.model_dump(include=fields) for entry in entries)
+
+    def add_records(self, records: Iterable[Mapping]) -> None:
+        """Add raw entry dicts, as streamed by ``index_log.iter_entries``."""
+        hashes: list[int] = []
+        urls: list[int] = []
+        for record in records:
+            hashes.append(hash_key(record["content_hash"]))
+            urls.append(url_key(record["source_url"]))
+            minhash = record.get("minhash")
+            if minhash and self._near is not None:
+                self._near.add(decode(minhash))
+        self._hashes.update(hashes)
+        self._urls.update(urls)
+
+    def signature(self, text: str) -> array | None:
+        """MinHash signature of *text*, or None if near-dup mode is off."""
+        return self._hasher.signature(text) if self._hasher else None
 
     def is_duplicate(
         self,
         *,
         content_hash: str,
-        source_url: str,
+        source_url: str | None = None,
     ) -> bool:
-        return content_hash in self._hashes or source_url in self._urls
+        hkey = hash_key(content_hash)
+        base = self._base
+        if hkey in self._hashes or (base is not None and hkey in base.hashes):
+            return True
+        shared = self._shared
+        if shared is not None and shared.contains(content_hash=content_hash):
+            if shared.is_claimed(content_hash=content_hash):
+                self.claimed_skips += 1
+            return True
+        return source_url is not None and self.is_known_url(source_url)
+
+    def is_known_url(self, url: str, *, claims: bool = True) -> bool:
+        """Whether *url* (in any spelling) is already in the canon.
+
+        Lets adapters skip fetching pages that would be dropped anyway.
+        With *claims*, URLs claimed by other running sessions count too.
+        """
+        ukey = url_key(url)
+        if ukey in self._urls:
+            return True
+        if self._base is not None and ukey in self._base.urls:
+            return True
+        shared = self._shared
+        if shared is None or not shared.contains_url(url, claims=claims):
+            return False
+        if claims and shared.is_claimed(source_url=url):
+            self.claimed_skips += 1
+        return True
 
-    def add(self, *, content_hash: str, source_url: str) -> None:
-        self._hashes.add(content_hash)
-        self._urls.add(source_url)
+    def is_near_duplicate(self, signature: array) -> bool:
+        if self._near is None:
+            return False
+        base_near = self._base.near if self._base is not None else None
+        return self._near.query(signature) or (
+            base_near is not None and base_near.query(signature)
+        )
+
+    def claim(
+        self, *, content_hash: str, source_url: str, check_url: bool = True
+    ) -> bool:
+        """Reserve a section in the shared index just before writing it.
+
+        Returns False if another process claimed it since ``is_duplicate``.
+        Pass ``check_url=False`` for later sections of a text whose URL this
+        process already claimed.
+        """
+        if self._shared is None:
+            return True
+        if not self._shared.claim(
+            content_hash=content_hash, source_url=source_url, check_url=check_url
+        ):
+            self.claimed_skips += 1
+            return False
+        url = source_url if check_url else None
+        epoch = self._shared.epoch
+        self._claims[content_hash] = (url, epoch)
+        if self._on_claim is not None:
+            self._on_claim(content_hash, url, epoch)
+        return True
+
+    def hold(self, *, content_hash: str, source_url: str | None, epoch: int | None) -> None:
+        """Take over a claim made by an earlier, interrupted run."""
+        self._claims[content_hash] = (source_url, epoch)
+
+    def release_claims(self) -> list[str]:
+        """Withdraw every claim held; returns their content hashes."""
+        claims, self._claims = self._claims, {}
+        for content_hash, (url, epoch) in claims.items():
+            self.release(content_hash=content_hash, source_url=url, epoch=epoch)
+        return list(claims)
+
+    def release(
+        self, *, content_hash: str, source_url: str | None = None, epoch: int | None = None
+    ) -> None:
+        """Withdraw a claim from the shared index."""
+        if self._shared is not None:
+            self._shared.release(content_hash=content_hash, source_url=source_url, epoch=epoch)
+
+    def add(
+        self,
+        *,
+        content_hash: str,
+        source_url: str,
+        signature: array | None = None,
+    ) -> None:
+        self._hashes.add(hash_key(content_hash))
+        self._urls.add(url_key(source_url))
+        if signature is not None and self._near is not None:
+            self._near.add(signature)
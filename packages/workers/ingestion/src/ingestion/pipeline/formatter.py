@@ -6,37 +6,55 @@ from pathlib import Path
 
 from slugify import slugify
 
-from ..models import CanonIndex, ExtractedText, IndexEntry, SourceType
+from ..models import ExtractedText, IndexEntry, SourceType
 from .cleaner import clean_text
 from .dedup import Deduplicator, compute_hash
-from .splitter import split_text
+from .index_log import IndexLog
+from .minhash import encode
+from .splitter import TextCounter, count_words, split_text
+from .writer import CanonFile
 
 
-def format_and_write(
+def format_sections(
     extracted: ExtractedText,
     *,
     source_type: SourceType,
-    output_dir: Path,
-    index: CanonIndex,
+    index: IndexLog,
     dedup: Deduplicator,
-    max_words: int = 4000,
-) -> list[str]:
-    """Clean, split, deduplicate, format, and write canon files.
-
-    Returns the list of filenames written (empty if all duplicates).
+    max_size: int = 4000,
+    counter: TextCounter = count_words,
+) -> list[CanonFile]:
+    """Clean, split, deduplicate and format a text into canon files.
+
+    Sections are at most *max_size* units of *counter* (words by default).
+    Each returned file has its index id reserved and is already recorded in
+    *dedup*; the caller writes it and appends its entry to *index* (see
+    ``CanonWriter``). Returns an empty list if all sections are duplicates.
     """
-    output_dir.mkdir(parents=True, exist_ok=True)
+    # The source URL identifies the whole text; its sections share it, so
+    # URLs are checked once here and sections only by content below.
+    if dedup.is_known_url(extracted.source_url):
+        return []
     cleaned = clean_text(extracted.body)
     if not cleaned:
         return []
 
-    sections = split_text(cleaned, max_words=max_words)
-    written: list[str] = []
+    sections = split_text(cleaned, max_size, counter=counter)
+    files: list[CanonFile] = []
 
     for i, section in enumerate(sections):
         content_hash = compute_hash(section)
-        if dedup.is_duplicate(
-            content_hash=content_hash, source_url=extracted.source_url
+        if dedup.is_duplicate(content_hash=content_hash):
+            continue
+        signature = dedup.signature(section)
+        if signature is not None and dedup.is_near_duplicate(signature):
+            continue
+        # The first section kept also claims the URL, atomically with its
+        # content, against other processes.
+        if not dedup.claim(
+            content_hash=content_hash,
+            source_url=extracted.source_url,
+            check_url=not files,
         ):
             continue
 
@@ -57,28 +75,55 @@ def format_and_write(
             frontmatter += f"date: \"{extracted.date}\"\n"
         frontmatter += f"---\n\n"
 
-        full_content = frontmatter + section
-        (output_dir / filename).write_text(full_content, encoding="utf-8")
-
-        word_count = len(section.split())
-        entry_id = f"canon_{len(index.entries) + 1:04d}"
-
-        index.entries.append(
-            IndexEntry(
-                id=entry_id,
-                filename=filename,
-                title=extracted.title,
-                source_url=extracted.source_url,
-                source_type=source_type,
-                date=extracted.date,
-                content_hash=f"sha256:{content_hash}",
-                word_count=word_count,
-            )
+        entry = IndexEntry(
+            id=index.next_id(),
+            filename=filename,
+            title=extracted.title,
+            source_url=extracted.source_url,
+            source_type=source_type,
+            date=extracted.date,
+            content_hash=f"sha256:{content_hash}",
+            word_count=len(section.split()),
+            minhash=encode(signature) if signature is not None else None,
+        )
+        dedup.add(
+            content_hash=content_hash,
+            source_url=extracted.source_url,
+            signature=signature,
         )
-        dedup.add(content_hash=content_hash, source_url=extracted.source_url)
-        written.append(filename)
+        files.append(CanonFile(filename, frontmatter + section, entry))
+
+    return files
+
 
-    return written
+def format_and_write(
+    extracted: ExtractedText,
+    *,
+    source_type: SourceType,
+    output_dir: Path,
+    index: IndexLog,
+    dedup: Deduplicator,
+    max_size: int = 4000,
+    counter: TextCounter = count_words,
+) -> list[str]:
+    """Format a text and write its canon files synchronously.
+
+    Each written file is appended to *index* immediately. Returns the list
+    of filenames written (empty if all duplicates).
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    files = format_sections(
+        extracted,
+        source_type=source_type,
+        index=index,
+        dedup=dedup,
+        max_size=max_size,
+        counter=counter,
+    )
+    for file in files:
+        (output_dir / file.filename).write_text(file.content, encoding="utf-8")
+        index.append(file.entry)
+    return [file.filename for file in files]
 
 
 def _escape_yaml(s: str) -> str:
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from ..models import IndexEntry
+
+INDEX_JSON = "index.json"
+INDEX_LOG = "index.jsonl"
+
+
+def iter_entries(canon_dir: Path) -> Iterator[dict]:
+    """Yield raw entry dicts from ``index.json`` followed by ``index.jsonl``.
+
+    Entries are plain dicts, not ``IndexEntry`` models, so large canons can
+    be scanned (e.g. to seed a Deduplicator) without validating each one.
+    """
+    compacted = 0
+    json_path = canon_dir / INDEX_JSON
+    if json_path.exists():
+        with json_path.open(encoding="utf-8") as fh:
+            entries = json.load(fh).get("entries", [])
+        # Ids can have gaps (see IndexLog), so use the highest, not the count.
+        compacted = _max_ordinal(entries)
+        yield from entries
+        del entries
+
+    log_path = canon_dir / INDEX_LOG
+    if not log_path.exists():
+        return
+    with log_path.open(encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn final line after a crash
+            # Skip records already folded into index.json by a compaction
+            # that crashed before truncating the log.
+            n = _ordinal(record.get("id", ""))
+            if n is not None and n <= compacted:
+                continue
+            yield record
+
+
+class IndexLog:
+    """Append-only canon index: ``index.jsonl`` beside ``index.json``.
+
+    One line is appended per written file (by ``format_and_write`` or the
+    ``CanonWriter`` thread), so the index survives a crash; ``compact``
+    folds the log into ``index.json``. Ids are reserved with ``next_id``
+    when a file is formatted, which may be before earlier files are
+    appended, so lines can be out of id order and a crash can leave gaps;
+    new ids therefore continue from the highest id, not the entry count.
+    """
+
+    def __init__(self, canon_dir: Path, agent_id: str) -> None:
+        self.dir = canon_dir
+        self.agent_id = agent_id
+        self.count = self._reserved = 0
+        for entry in iter_entries(canon_dir):
+            self.count += 1
+            self._reserved = max(self._reserved, _ordinal(entry.get("id", "")) or 0)
+        self._fh = None
+
+    def next_id(self) -> str:
+        """Reserve the id of the next entry."""
+        self._reserved += 1
+        return f"canon_{self._reserved:04d}"
+
+    def append(self, entry: IndexEntry) -> None:
+        if self._fh is None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._fh = (self.dir / INDEX_LOG).open("a", encoding="utf-8")
+        exclude = {"minhash"} if entry.minhash is None else None
+        self._fh.write(entry.model_dump_json(exclude=exclude) + "\n")
+        self._fh.flush()
+        self.count += 1
+
+    def fsync(self) -> None:
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def compact(self) -> int:
+        """Rewrite ``index.json`` with every entry and empty the log.
+
+        Returns the total number of entries.
+        """
+        self.close()
+        json_path = self.dir / INDEX_JSON
+        now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        header = {"agent_id": self.agent_id, "created": now}
+        if json_path.exists():
+            with json_path.open(encoding="utf-8") as fh:
+                existing = json.load(fh)
+            header["agent_id"] = existing.get("agent_id", self.agent_id)
+            header["created"] = existing.get("created", now)
+            del existing
+
+        entries = list(iter_entries(self.dir))
+        tmp = json_path.with_suffix(".json.tmp")
+        tmp.write_text(
+            json.dumps({**header, "updated": now, "entries": entries}, indent=2),
+            encoding="utf-8",
+        )
+        os.replace(tmp, json_path)
+        (self.dir / INDEX_LOG).unlink(missing_ok=True)
+        self.count = len(entries)
+        self._reserved = max(self._reserved, _max_ordinal(entries))
+        return self.count
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def _max_ordinal(entries: Iterable[dict]) -> int:
+    """Highest ``canon_NNNN`` ordinal among raw entry dicts (0 if none)."""
+    return max((_ordinal(e.get("id", "")) or 0 for e in entries), default=0)
+
+
+def _ordinal(entry_id: str) -> int | None:
+    m = re.search(r"(\d+)$", entry_id)
+    return int(m.group(1)) if m else None
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import base64
+import random
+import zlib
+from array import array
+
+try:  # optional: vectorised signatures
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Smallest prime above 2**32: a * h + b stays below 2**64 for 32-bit a, b, h.
+_PRIME = (1 << 32) + 15
+_MASK = (1 << 32) - 1
+
+
+def shingles(text: str, size: int = 5) -> set[int]:
+    """CRC32 hashes of the word *size*-grams of the lowercased text."""
+    words = text.lower().split()
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+
+
+class MinHasher:
+    """MinHash signatures from ``num_perm`` universal hash permutations.
+
+    The permutations come from a fixed seed, so signatures computed in
+    different processes (and persisted in the index) are comparable.
+    Uses numpy when installed; the pure-Python path gives identical results.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1) -> None:
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._perms = [
+            (rng.randrange(1, 1 << 32), rng.randrange(0, 1 << 32))
+            for _ in range(num_perm)
+        ]
+        if np is not None:
+            self._a = np.array([a for a, _ in self._perms], dtype=np.uint64)[:, None]
+            self._b = np.array([b for _, b in self._perms], dtype=np.uint64)[:, None]
+
+    def signature(self, text: str) -> array | None:
+        hashes = shingles(text, self.shingle_size)
+        if not hashes:
+            return None
+        if np is not None:
+            h = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+            mins = ((self._a * h + self._b) % np.uint64(_PRIME) & np.uint64(_MASK)).min(axis=1)
+            return array("I", mins.astype(np.uint32).tobytes())
+        return array("I", [
+            min(((a * h + b) % _PRIME) & _MASK for h in hashes)
+            for a, b in self._perms
+        ])
+
+
+def encode(sig: array) -> str:
+    data = sig.tobytes() if sig.itemsize == 4 else array("I", sig).tobytes()
+    return base64.b64encode(data).decode("ascii")
+
+
+def decode(text: str) -> array:
+    sig = array("I")
+    sig.frombytes(base64.b64decode(text))
+    return sig
+
+
+def _bands_for(threshold: float, num_perm: int) -> tuple[int, int]:
+    """Pick (bands, rows) whose LSH S-curve midpoint is just below *threshold*.
+
+    Erring low trades extra candidate checks for fewer missed duplicates.
+    """
+    def midpoint(br: tuple[int, int]) -> float:
+        return (1 / br[0]) ** (1 / br[1])
+
+    candidates = [
+        (b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0
+    ]
+    below = [br for br in candidates if midpoint(br) <= threshold]
+    if below:
+        return max(below, key=midpoint)
+    return min(candidates, key=lambda br: abs(midpoint(br) - threshold))
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures for near-duplicate lookups.
+
+    A query only compares against signatures sharing at least one band
+    bucket, so lookups stay sub-linear in the number of indexed entries.
+    """
+
+    def __init__(self, threshold: float, num_perm: int = 128) -> None:
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _bands_for(threshold, num_perm)
+        self._tables: list[dict[int, list[int]]] = [{} for _ in range(self.bands)]
+        self._sigs: list[array] = []
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def add(self, sig: array) -> None:
+        if len(sig) != self.num_perm:
+            return  # computed with different parameters; not comparable
+        idx = len(self._sigs)
+        self._sigs.append(sig)
+        for table, key in zip(self._tables, self._band_keys(sig)):
+            table.setdefault(key, []).append(idx)
+
+    def query(self, sig: array) -> bool:
+        """True if an indexed signature's estimated Jaccard ≥ threshold."""
+        if len(sig) != self.num_perm:
+            return False
+        seen: set[int] = set()
+        for table, key in zip(self._tables, self._band_keys(sig)):
+            for idx in table.get(key, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                other = self._sigs[idx]
+                same = sum(1 for x, y in zip(sig, other) if x == y)
+                if same / self.num_perm >= self.threshold:
+                    return True
+        return False
+
+    def _band_keys(self, sig: array) -> list[int]:
+        r = self.rows
+        return [hash(tuple(sig[i * r:(i + 1) * r])) for i in range(self.bands)]
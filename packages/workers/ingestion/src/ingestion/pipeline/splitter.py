@@ -1,78 +1,189 @@
 from __future__ import annotations
 
 import re
+from typing import Callable, NamedTuple
+
+# Measures a piece of text in budget units (words, tokens, ...).
+TextCounter = Callable[[str], int]
+
+# Block boundaries: blank-line runs, and newlines before a ``#``/``##``
+# heading line.
+_BOUNDARY = re.compile(r"\n{2,}|\n(?=#{1,2}\s)")
+_HEADING = re.compile(r"#{1,2}\s")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n")
+_WORD = re.compile(r"\S+")
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def token_counter(encoding: str = "cl100k_base") -> TextCounter:
+    """Count tokens with a local tiktoken encoding (``pip install tiktoken``)."""
+    try:
+        import tiktoken
+    except ImportError as exc:
+        raise ImportError(
+            "Token-based splitting requires tiktoken: pip install 'ingestion[tokens]'"
+        ) from exc
+    enc = tiktoken.get_encoding(encoding)
+    return lambda text: len(enc.encode_ordinary(text))
+
+
+def make_counter(kind: str = "words", encoding: str = "cl100k_base") -> TextCounter:
+    if kind == "words":
+        return count_words
+    if kind == "tokens":
+        return token_counter(encoding)
+    raise ValueError(f"Unknown counter: {kind}")
 
 
 def split_text(
     text: str,
-    max_words: int = 4000,
+    max_size: int = 4000,
+    *,
+    counter: TextCounter = count_words,
 ) -> list[str]:
-    """Split a long document into sections.
+    """Split a long document into sections of at most *max_size* units.
 
     Strategy:
     1. Split on top-level headings (``# …`` or ``## …``) when present.
-    2. If a resulting section still exceeds *max_words*, split on blank-line
-       paragraph boundaries.
-    3. Never split mid-paragraph.
+    2. If a resulting section still exceeds *max_size*, pack its blank-line
+       paragraphs into chunks.
+    3. Only a paragraph that alone exceeds *max_size* is split further, at
+       sentence and then word boundaries.
+
+    The text is scanned once for block offsets and each block is counted
+    once; sections are slices of the original text.
     """
-    if _word_count(text) <= max_words:
+    blocks = _blocks(text, counter)
+    # Cost of the blank line joining two blocks (0 words, ~1 token).
+    sep = counter("\n\n")
+    if _size(blocks, sep) <= max_size:
         return [text]
 
-    # Try heading-based split first.
-    sections = _split_on_headings(text)
-    if len(sections) > 1:
-        return _enforce_limit(sections, max_words)
-
-    # Fall back to paragraph-based split.
-    return _split_on_paragraphs(text, max_words)
+    chunks: list[str] = []
+    for section in _group_by_heading(blocks):
+        if _size(section, sep) <= max_size:
+            chunks.append(text[section[0].start:section[-1].end])
+        else:
+            chunks.extend(_pack(text, section, max_size, counter, sep))
+    return [c for c in (c.strip() for c in chunks) if c]
 
 
 # ---------------------------------------------------------------------------
 # Internals
 # ---------------------------------------------------------------------------
 
-def _word_count(text: str) -> int:
-    return len(text.split())
+class _Block(NamedTuple):
+    start: int
+    end: int
+    size: int
+    heading: bool
+
+
+def _blocks(text: str, counter: TextCounter) -> list[_Block]:
+    """Offsets and sizes of the blank-line/heading-separated blocks."""
+    blocks: list[_Block] = []
+    start = 0
+    for m in _BOUNDARY.finditer(text):
+        _add_block(blocks, text, start, m.start(), counter)
+        start = m.end()
+    _add_block(blocks, text, start, len(text), counter)
+    return blocks
+
 
+def _add_block(
+    blocks: list[_Block], text: str, start: int, end: int, counter: TextCounter
+) -> None:
+    piece = text[start:end]
+    if piece.strip():
+        blocks.append(_Block(start, end, counter(piece), _HEADING.match(piece) is not None))
 
-def _split_on_headings(text: str) -> list[str]:
-    """Split on lines starting with ``#`` or ``##``."""
-    parts: list[str] = []
-    current: list[str] = []
-    for line in text.splitlines(keepends=True):
-        if re.match(r"^#{1,2}\s", line) and current:
-            parts.append("".join(current))
-            current = []
-        current.append(line)
-    if current:
-        parts.append("".join(current))
-    return [p.strip() for p in parts if p.strip()]
 
+def _size(blocks: list[_Block], sep: int) -> int:
+    return sum(b.size for b in blocks) + sep * (len(blocks) - 1)
+
+
+def _group_by_heading(blocks: list[_Block]) -> list[list[_Block]]:
+    sections: list[list[_Block]] = []
+    for block in blocks:
+        if block.heading or not sections:
+            sections.append([])
+        sections[-1].append(block)
+    return sections
+
+
+def _pack(
+    text: str, blocks: list[_Block], max_size: int, counter: TextCounter, sep: int
+) -> list[str]:
+    """Greedily pack consecutive blocks into slices of at most *max_size*."""
+    chunks: list[str] = []
+    first: _Block | None = None
+    last: _Block | None = None
+    size = 0
+    for block in blocks:
+        if block.size > max_size:
+            if first is not None:
+                chunks.append(text[first.start:last.end])
+                first, size = None, 0
+            chunks.extend(_split_block(text[block.start:block.end], max_size, counter, sep))
+            continue
+        if first is not None and size + sep + block.size > max_size:
+            chunks.append(text[first.start:last.end])
+            first, size = None, 0
+        if first is None:
+            first, size = block, block.size
+        else:
+            size += sep + block.size
+        last = block
+    if first is not None:
+        chunks.append(text[first.start:last.end])
+    return chunks
+
+
+def _split_block(
+    block: str, max_size: int, counter: TextCounter, sep: int
+) -> list[str]:
+    """Split one oversized paragraph at sentences, then at words."""
+    pieces: list[_Block] = []
+    start = 0
+    for m in _SENTENCE_END.finditer(block):
+        _add_block(pieces, block, start, m.start(), counter)
+        start = m.end()
+    _add_block(pieces, block, start, len(block), counter)
 
-def _split_on_paragraphs(text: str, max_words: int) -> list[str]:
-    paragraphs = re.split(r"\n{2,}", text)
     chunks: list[str] = []
-    current: list[str] = []
-    current_wc = 0
-    for para in paragraphs:
-        wc = _word_count(para)
-        if current and current_wc + wc > max_words:
-            chunks.append("\n\n".join(current))
-            current = []
-            current_wc = 0
-        current.append(para)
-        current_wc += wc
-    if current:
-        chunks.append("\n\n".join(current))
+    for piece in _pack_spans(pieces, max_size, sep):
+        if piece.size > max_size:
+            chunks.extend(_split_words(block[piece.start:piece.end], max_size, counter))
+        else:
+            chunks.append(block[piece.start:piece.end])
     return chunks
 
 
-def _enforce_limit(sections: list[str], max_words: int) -> list[str]:
-    """Recursively split any section that exceeds *max_words*."""
-    result: list[str] = []
-    for section in sections:
-        if _word_count(section) <= max_words:
-            result.append(section)
+def _pack_spans(pieces: list[_Block], max_size: int, sep: int) -> list[_Block]:
+    spans: list[_Block] = []
+    for piece in pieces:
+        if spans and spans[-1].size + sep + piece.size <= max_size:
+            prev = spans[-1]
+            spans[-1] = _Block(prev.start, piece.end, prev.size + sep + piece.size, False)
         else:
-            result.extend(_split_on_paragraphs(section, max_words))
-    return result
+            spans.append(piece)
+    return spans
+
+
+def _split_words(piece: str, max_size: int, counter: TextCounter) -> list[str]:
+    """Last resort: cut a run-on sentence into word windows that fit."""
+    words = [(m.start(), m.end()) for m in _WORD.finditer(piece)]
+    # Estimate each window from the average size per word, then shrink.
+    per_word = max(1.0, counter(piece) / max(1, len(words)))
+    chunks: list[str] = []
+    i = 0
+    while i < len(words):
+        n = max(1, min(len(words) - i, int(max_size / per_word)))
+        while n > 1 and counter(piece[words[i][0]:words[i + n - 1][1]]) > max_size:
+            n = max(1, int(n * 0.9))
+        chunks.append(piece[words[i][0]:words[i + n - 1][1]])
+        i += n
+    return chunks
@@ -0,0 +1,87 @@
+"""URL canonicalisation for deduplication.
+
+Different spellings of the same page (tracking parameters, ``http`` vs
+``https``, ``www.``, trailing slashes, fragments, the many YouTube URL
+forms) map to one canonical string, so a page already in the canon is
+recognised before it is fetched.
+"""
+
+from __future__ import annotations
+
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that never change page content.
+_TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid",
+    "igshid", "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi",
+    "mkt_tok", "ref", "ref_src", "ref_url", "si", "feature",
+})
+_TRACKING_PREFIXES = ("utm_", "pk_", "mtm_")
+
+_YOUTUBE_HOSTS = frozenset({
+    "youtube.com", "m.youtube.com", "music.youtube.com",
+    "youtube-nocookie.com", "youtu.be",
+})
+_YOUTUBE_PATH_ID = re.compile(r"^/(?:shorts|embed|live|v|e)/([\w-]{11})")
+_VIDEO_ID = re.compile(r"^[\w-]{11}$")
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def youtube_video_id(url: str) -> str | None:
+    """The video ID of any YouTube video URL form, else None."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").removeprefix("www.")
+    if host not in _YOUTUBE_HOSTS:
+        return None
+    if host == "youtu.be":
+        vid = parts.path.lstrip("/").split("/", 1)[0]
+    elif m := _YOUTUBE_PATH_ID.match(parts.path):
+        vid = m.group(1)
+    elif parts.path.rstrip("/") == "/watch":
+        vid = dict(parse_qsl(parts.query)).get("v", "")
+    else:
+        return None
+    return vid if _VIDEO_ID.match(vid) else None
+
+
+def canonicalize_url(url: str) -> str:
+    """Canonical form of *url* for dedup keys (not for fetching).
+
+    Lowercases scheme and host, treats ``http`` as ``https``, drops
+    ``www.``, default ports, fragments, tracking parameters and trailing
+    slashes, and sorts the remaining query. YouTube video URLs become
+    ``https://www.youtube.com/watch?v=<id>``. Non-HTTP strings are
+    returned stripped but otherwise unchanged.
+    """
+    url = url.strip()
+    if vid := youtube_video_id(url):
+        return f"https://www.youtube.com/watch?v={vid}"
+
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.rstrip(".").removeprefix("www.")
+    if ":" in host:  # IPv6 literal
+        host = f"[{host}]"
+    if port is not None and port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS
+        and not k.lower().startswith(_TRACKING_PREFIXES)
+    )
+    return urlunsplit(("https", host, path, urlencode(query), ""))
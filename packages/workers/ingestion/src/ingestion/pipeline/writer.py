@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Literal, NamedTuple
+
+from ..models import IndexEntry
+from .blobs import BlobStore
+from .index_log import IndexLog
+
+Durability = Literal["none", "batch", "final"]
+
+
+class CanonFile(NamedTuple):
+    """One formatted canon file, ready to be written and indexed."""
+
+    filename: str
+    content: str
+    entry: IndexEntry
+
+
+@dataclass
+class WriteStats:
+    files: int = 0
+    batches: int = 0
+    bytes: int = 0
+    reused: int = 0
+    mean_ms: float = 0.0
+    p95_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def summary(self) -> str:
+        reused = f" ({self.reused} already in the blob store)" if self.reused else ""
+        return (
+            f"{self.files} files in {self.batches} batches{reused}, "
+            f"latency mean {self.mean_ms:.1f} ms, p95 {self.p95_ms:.1f} ms, "
+            f"max {self.max_ms:.1f} ms"
+        )
+
+
+_STOP = object()
+
+
+class CanonWriter:
+    """Write canon files on a dedicated thread, in batches.
+
+    ``put`` queues a file (waiting only when *max_pending* files are
+    already queued) so extraction carries on while earlier files are
+    flushed. The thread drains up to *batch_size* files at a time, writes
+    them, then appends their entries to *index*, so the index never points
+    at a file that is not on disk.
+
+    *durability*: ``none`` leaves flushing to the OS; ``batch`` fsyncs each
+    batch's files, the index and the directory before moving on; ``final``
+    fsyncs everything once in ``close``.
+
+    With *blobs*, each file body is stored once in the ``BlobStore`` and
+    the output file is a hardlink to it; ``bytes`` then counts only bodies
+    that were not already stored.
+
+    Latency is measured from ``put`` to the file's batch being written.
+    *on_written* is called from the writer thread with each written batch.
+    """
+
+    _LATENCY_SAMPLES = 4096
+
+    def __init__(
+        self,
+        output_dir: Path,
+        index: IndexLog,
+        *,
+        durability: Durability = "final",
+        max_pending: int = 256,
+        batch_size: int = 64,
+        on_written: Callable[[list[CanonFile]], None] | None = None,
+        blobs: BlobStore | None = None,
+    ) -> None:
+        self.output_dir = output_dir
+        self.index = index
+        self.blobs = blobs
+        self.durability = durability
+        self.batch_size = max(1, batch_size)
+        self._on_written = on_written
+        self._queue: queue.Queue = queue.Queue(max(1, max_pending))
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._written = 0
+        self._error: BaseException | None = None
+        self._closed = False
+        self._unsynced: list[Path] = []
+        self._unsynced_dirs: set[Path] = set()
+        self._files = 0
+        self._batches = 0
+        self._bytes = 0
+        self._reused = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latencies: deque[float] = deque(maxlen=self._LATENCY_SAMPLES)
+        self._thread = threading.Thread(target=self._run, name="canon-writer", daemon=True)
+        self._thread.start()
+
+    async def put(self, file: CanonFile) -> None:
+        self._raise_error()
+        item = (file, time.perf_counter())
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, item)
+        self._submitted += 1
+
+    async def barrier(self) -> None:
+        """Wait until every file queued so far has been written."""
+        target = self._submitted
+        await asyncio.to_thread(self._wait_written, target)
+        self._raise_error()
+
+    async def close(self) -> WriteStats:
+        """Write everything queued, apply final durability, stop the thread."""
+        if self._closed:
+            return self.stats()
+        self._closed = True
+        await asyncio.to_thread(self._queue.put, _STOP)
+        await asyncio.to_thread(self._thread.join)
+        self._raise_error()
+        if self.durability == "final":
+            await asyncio.to_thread(self._sync, self._unsynced, self._unsynced_dirs)
+            self._unsynced.clear()
+            self._unsynced_dirs.clear()
+        return self.stats()
+
+    def stats(self) -> WriteStats:
+        samples = sorted(self._latencies)
+        p95 = samples[int(len(samples) * 0.95) - 1] if samples else 0.0
+        return WriteStats(
+            files=self._files,
+            batches=self._batches,
+            bytes=self._bytes,
+            reused=self._reused,
+            mean_ms=self._latency_total / self._files * 1000 if self._files else 0.0,
+            p95_ms=p95 * 1000,
+            max_ms=self._latency_max * 1000,
+        )
+
+    # -- writer thread -----------------------------------------------------
+
+    def _run(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            batch = [] if stop else [item]
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch and self._error is None:
+                try:
+                    self._write_batch(batch)
+                except BaseException as exc:  # surfaced on the next put/barrier
+                    self._error = exc
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
+            if stop:
+                return
+
+    def _write_batch(self, batch: list[tuple[CanonFile, float]]) -> None:
+        fsync = self.durability == "batch"
+        paths: list[Path] = []
+        blob_dirs: set[Path] = set()
+        for file, _ in batch:
+            path = self.output_dir / file.filename
+            data = file.content.encode("utf-8")
+            if self.blobs is not None:
+                blob, created = self.blobs.put(data, fsync=fsync)
+                self.blobs.link(blob, path, data=data, fsync=fsync)
+                if created:
+                    blob_dirs.add(blob.parent)
+                    self._bytes += len(data)
+                else:
+                    self._reused += 1
+            else:
+                with path.open("wb") as fh:
+                    fh.write(data)
+                    if fsync:
+                        fh.flush()
+                        os.fsync(fh.fileno())
+                self._bytes += len(data)
+            paths.append(path)
+        for file, _ in batch:
+            self.index.append(file.entry)
+        if fsync:
+            self.index.fsync()
+            for d in blob_dirs:
+                _fsync_dir(d)
+            _fsync_dir(self.output_dir)
+        elif self.durability == "final":
+            self._unsynced.extend(paths)
+            self._unsynced_dirs |= blob_dirs
+
+        done = time.perf_counter()
+        for _, queued_at in batch:
+            latency = done - queued_at
+            self._latencies.append(latency)
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+        self._files += len(batch)
+        self._batches += 1
+        if self._on_written is not None:
+            self._on_written([file for file, _ in batch])
+
+    def _wait_written(self, target: int) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: self._written >= target)
+
+    def _sync(self, paths: list[Path], dirs: set[Path]) -> None:
+        # A hardlink shares its blob's inode, so this also syncs the blob.
+        for path in paths:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.index.fsync()
+        for d in dirs:
+            _fsync_dir(d)
+        _fsync_dir(self.output_dir)
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -1,24 +1,31 @@
 from __future__ import annotations
 
-import asyncio
 from pathlib import Path
 from typing import AsyncIterator
 
-from fastapi import APIRouter, HTTPException, UploadFile
+from fastapi import APIRouter, Header, HTTPException, Query, UploadFile
 from sse_starlette.sse import EventSourceResponse
 
-from . import ai_client, executor
+from . import ai_client, broadcast
+from .adapters.politeness import scheduler
 from .config import settings
+from .execlog import read_log
+from .jobs import job_queue, pool
 from .models import (
     CreateSessionRequest,
+    Job,
+    JobState,
     Session,
+    SessionDetail,
+    SessionPage,
     SessionStage,
     Source,
     SourceType,
     UpdatePlanRequest,
     UpdateSourcesRequest,
 )
-from .session import store
+from .pipeline.index_log import IndexLog
+from .session import SORT_FIELDS, store
 
 router = APIRouter()
 
@@ -51,9 +58,35 @@ async def create_session(body: CreateSessionRequest) -> Session:
     return store.create(session)
 
 
+@router.get("/sessions")
+async def list_sessions(
+    stage: SessionStage | None = None,
+    name: str | None = None,
+    order_by: str = "updated_at",
+    desc: bool = True,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+) -> SessionPage:
+    """List session summaries, filtered by stage and/or name substring."""
+    if order_by not in SORT_FIELDS:
+        raise HTTPException(400, f"order_by must be one of {', '.join(SORT_FIELDS)}")
+    return store.query(
+        stage=stage,
+        name=name,
+        order_by=order_by,
+        descending=desc,
+        limit=limit,
+        offset=offset,
+    )
+
+
 @router.get("/sessions/{session_id}")
-async def get_session(session_id: str) -> Session:
-    return _get_session(session_id)
+async def get_session(session_id: str) -> SessionDetail:
+    session = _get_session(session_id)
+    return SessionDetail(
+        **session.model_dump(),
+        log=[msg for _, msg in read_log(session.log_path)],
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -133,19 +166,75 @@ async def edit_plan(session_id: str, body: UpdatePlanRequest) -> Session:
 
 
 @router.post("/sessions/{session_id}/plan/confirm")
-async def confirm_plan(session_id: str) -> dict:
-    """Confirm the plan and start execution directly."""
+async def confirm_plan(session_id: str, priority: int = 0) -> dict:
+    """Confirm the plan and queue the session for execution."""
     session = _get_session(session_id)
     if not session.plan:
         raise HTTPException(400, "No plan to confirm")
+    if job_queue.active_for_session(session_id):
+        raise HTTPException(409, "Execution is already queued or running")
 
     session.stage = SessionStage.EXECUTING
     store.update(session)
 
-    # Launch execution in the background — no codegen, just run adapters.
-    asyncio.create_task(executor.execute(session.id))
+    # Queue execution — no codegen, the worker pool just runs adapters.
+    job = _enqueue(session_id, priority=priority)
+
+    return {"status": "queued", "session_id": session.id, "job_id": job.id}
+
+
+@router.post("/sessions/{session_id}/execute/resume")
+async def resume_execution(session_id: str, priority: int = 0) -> dict:
+    """Continue an interrupted or failed execution from its last checkpoint."""
+    session = _get_session(session_id)
+    if session.stage not in (SessionStage.EXECUTING, SessionStage.ERROR):
+        raise HTTPException(400, f"Cannot resume a session in stage {session.stage.value}")
+    if job_queue.active_for_session(session_id):
+        raise HTTPException(409, "Execution is already queued or running")
+
+    session.stage = SessionStage.EXECUTING
+    store.update(session)
+
+    job = _enqueue(session_id, priority=priority, resume=True)
+
+    return {"status": "queued", "session_id": session.id, "job_id": job.id}
+
+
+def _enqueue(session_id: str, *, priority: int, resume: bool = False) -> Job:
+    job = job_queue.enqueue(session_id, priority=priority, resume=resume)
+    pool.notify()
+    return job
+
+
+# ---------------------------------------------------------------------------
+# Jobs
+# ---------------------------------------------------------------------------
+
+@router.get("/jobs")
+async def list_jobs(
+    state: JobState | None = None,
+    session_id: str | None = None,
+    limit: int = 100,
+) -> list[Job]:
+    return job_queue.list_all(state=state, session_id=session_id, limit=limit)
 
-    return {"status": "executing", "session_id": session.id}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Job:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(404, f"Job {job_id} not found")
+    return job
+
+
+# ---------------------------------------------------------------------------
+# Crawler
+# ---------------------------------------------------------------------------
+
+@router.get("/crawler/hosts")
+async def crawler_hosts() -> dict:
+    """Per-host politeness state and request rates for crawls in this process."""
+    return {"hosts": scheduler.stats()}
 
 
 # ---------------------------------------------------------------------------
@@ -153,34 +242,41 @@ async def confirm_plan(session_id: str) -> dict:
 # ---------------------------------------------------------------------------
 
 @router.get("/sessions/{session_id}/execute/stream")
-async def execution_stream(session_id: str) -> EventSourceResponse:
-    session = _get_session(session_id)
+async def execution_stream(
+    session_id: str,
+    last_event_id: int | None = Header(None, alias="Last-Event-ID"),
+) -> EventSourceResponse:
+    """Stream execution log events; any number of clients may subscribe.
+
+    Events carry the log sequence number as their SSE ``id``, so a client
+    reconnecting with ``Last-Event-ID`` continues where it left off.
+    """
+    _get_session(session_id)
 
     async def _event_generator() -> AsyncIterator[dict]:
-        # If execution is already finished, replay the log.
-        if session.stage in (SessionStage.DONE, SessionStage.ERROR):
-            for line in session.log:
-                yield {"data": line}
-            yield {"data": f"[{session.stage.value}]"}
-            return
-
-        # Wait briefly for the stream queue to appear.
-        queue = None
-        for _ in range(50):
-            queue = executor.get_stream(session_id)
-            if queue is not None:
+        while True:
+            channel = broadcast.get_channel(session_id)
+            if channel is not None:
+                async for seq, line in channel.subscribe(last_event_id):
+                    yield {"id": str(seq), "data": line}
                 break
-            await asyncio.sleep(0.1)
 
-        if queue is None:
-            yield {"data": "[ERROR] No active execution stream"}
-            return
-
-        while True:
-            line = await queue.get()
-            if line is None:
+            session = _get_session(session_id)
+            # If execution is already finished, replay the log.
+            if session.stage in (SessionStage.DONE, SessionStage.ERROR):
+                for seq, line in read_log(session.log_path, last_event_id or 0):
+                    yield {"id": str(seq), "data": line}
                 break
-            yield {"data": line}
+
+            if not job_queue.active_for_session(session_id):
+                yield {"data": "[ERROR] No active execution stream"}
+                return
+
+            # Queued: wait for the worker to open the channel.
+            await broadcast.wait_for_open(session_id)
+
+        session = _get_session(session_id)
+        yield {"data": f"[{session.stage.value}]"}
 
     return EventSourceResponse(_event_generator())
 
@@ -204,3 +300,17 @@ async def list_output(session_id: str) -> dict:
         key=lambda x: x["filename"],
     )
     return {"files": files}
+
+
+@router.post("/sessions/{session_id}/output/compact")
+async def compact_index(session_id: str) -> dict:
+    """Fold the session's ``index.jsonl`` into ``index.json`` on demand."""
+    session = _get_session(session_id)
+    if job_queue.active_for_session(session_id):
+        raise HTTPException(409, "Cannot compact while an execution is queued or running")
+
+    output_dir = settings.output_dir / session_id
+    if not output_dir.exists():
+        raise HTTPException(404, "No output for this session")
+
+    return {"entries": IndexLog(output_dir, session.name).compact()}
@@ -1,14 +1,43 @@
 from __future__ import annotations
 
+import asyncio
+import sqlite3
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterator, Protocol
 
+from .canon import open_canon
 from .config import settings
-from .models import CanonIndex, Session
+from .models import Session, SessionPage, SessionStage, SessionSummary
 
+# Columns listings may be ordered by.
+SORT_FIELDS = ("created_at", "updated_at", "name", "stage")
 
-class SessionStore:
-    """File-backed session persistence."""
+
+class SessionBackend(Protocol):
+    def load(self, session_id: str) -> Session | None: ...
+    def save(self, session: Session) -> None: ...
+    def delete(self, session_id: str) -> bool: ...
+    def iter_all(self) -> Iterator[Session]: ...
+    def query(
+        self,
+        *,
+        stage: SessionStage | None,
+        name: str | None,
+        order_by: str,
+        descending: bool,
+        limit: int,
+        offset: int,
+    ) -> SessionPage: ...
+
+
+class FileSessionBackend:
+    """One JSON document per session under ``data/sessions``.
+
+    Listing parses every document; prefer the SQLite backend for large
+    numbers of sessions.
+    """
 
     @property
     def _dir(self) -> Path:
@@ -19,49 +48,276 @@ class SessionStore:
     def _path(self, session_id: str) -> Path:
         return self._dir / f"{session_id}.json"
 
+    def load(self, session_id: str) -> Session | None:
+        p = self._path(session_id)
+        if not p.exists():
+            return None
+        return Session.model_validate_json(p.read_text())
+
+    def save(self, session: Session) -> None:
+        self._path(session.id).write_text(
+            session.model_dump_json(indent=2)
+        )
+
+    def delete(self, session_id: str) -> bool:
+        p = self._path(session_id)
+        if p.exists():
+            p.unlink()
+            return True
+        return False
+
+    def iter_all(self) -> Iterator[Session]:
+        for p in sorted(self._dir.glob("*.json")):
+            yield Session.model_validate_json(p.read_text())
+
+    def query(self, *, stage, name, order_by, descending, limit, offset) -> SessionPage:
+        rows = [
+            SessionSummary.model_validate(s.model_dump(include=set(SessionSummary.model_fields)))
+            for s in self.iter_all()
+            if (stage is None or s.stage == stage)
+            and (name is None or name.lower() in s.name.lower())
+        ]
+        rows.sort(key=lambda r: getattr(r, order_by), reverse=descending)
+        return SessionPage(
+            total=len(rows),
+            limit=limit,
+            offset=offset,
+            items=rows[offset:offset + limit],
+        )
+
+
+class SQLiteSessionBackend:
+    """Sessions in ``data/sessions.db``, with indexed listing columns."""
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        id         TEXT PRIMARY KEY,
+        name       TEXT NOT NULL,
+        stage      TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        data       TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS sessions_stage ON sessions (stage);
+    CREATE INDEX IF NOT EXISTS sessions_name ON sessions (name COLLATE NOCASE);
+    CREATE INDEX IF NOT EXISTS sessions_created ON sessions (created_at);
+    CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            settings.data_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.path or settings.data_dir / "sessions.db",
+                isolation_level=None,
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self._SCHEMA)
+        return self._conn
+
+    def load(self, session_id: str) -> Session | None:
+        row = self._db.execute(
+            "SELECT data FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        return Session.model_validate_json(row[0]) if row else None
+
+    def save(self, session: Session) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions "
+            "(id, name, stage, created_at, updated_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                session.id,
+                session.name,
+                session.stage.value,
+                session.created_at.timestamp(),
+                session.updated_at.timestamp(),
+                session.model_dump_json(),
+            ),
+        )
+
+    def delete(self, session_id: str) -> bool:
+        cur = self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        return cur.rowcount > 0
+
+    def iter_all(self) -> Iterator[Session]:
+        for (data,) in self._db.execute("SELECT data FROM sessions ORDER BY id"):
+            yield Session.model_validate_json(data)
+
+    def query(self, *, stage, name, order_by, descending, limit, offset) -> SessionPage:
+        clauses, params = [], []
+        if stage is not None:
+            clauses.append("stage = ?")
+            params.append(stage.value)
+        if name is not None:
+            clauses.append("name LIKE ? ESCAPE '\\' COLLATE NOCASE")
+            escaped = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        total = self._db.execute(
+            f"SELECT COUNT(*) FROM sessions {where}", params
+        ).fetchone()[0]
+        # order_by is validated against SORT_FIELDS by SessionStore.query.
+        rows = self._db.execute(
+            f"SELECT id, name, stage, created_at, updated_at FROM sessions {where} "
+            f"ORDER BY {order_by} {'DESC' if descending else 'ASC'} LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+        items = [
+            SessionSummary(
+                id=r[0],
+                name=r[1],
+                stage=r[2],
+                created_at=datetime.fromtimestamp(r[3], timezone.utc),
+                updated_at=datetime.fromtimestamp(r[4], timezone.utc),
+            )
+            for r in rows
+        ]
+        return SessionPage(total=total, limit=limit, offset=offset, items=items)
+
+
+def make_backend(kind: str) -> SessionBackend:
+    if kind == "sqlite":
+        return SQLiteSessionBackend()
+    return FileSessionBackend()
+
+
+class SessionStore:
+    """Session persistence with a write-behind cache.
+
+    Storage is delegated to the backend chosen by ``settings.session_backend``.
+    Live ``Session`` objects are cached in-process. ``update`` only marks a
+    session dirty; dirty sessions are flushed together by a background
+    task every ``session_flush_interval`` seconds. Stage transitions are
+    written immediately, and everything is flushed on shutdown.
+    """
+
+    def __init__(self) -> None:
+        self._backend: SessionBackend | None = None
+        self._cache: OrderedDict[str, Session] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._stored_stage: dict[str, SessionStage] = {}
+        self._flusher: asyncio.Task | None = None
+
+    @property
+    def backend(self) -> SessionBackend:
+        if self._backend is None:
+            self._backend = make_backend(settings.session_backend)
+        return self._backend
+
     # -- CRUD ---------------------------------------------------------------
 
     def create(self, session: Session) -> Session:
-        # If a canon_path was supplied, pre-load the existing index for dedup.
+        # If a canon_path was supplied, record which version of it we saw.
+        # The index itself is loaded by the executor, never embedded here.
         if session.canon_path:
-            idx_path = Path(session.canon_path) / "index.json"
-            if idx_path.exists():
-                session.existing_index = CanonIndex.model_validate_json(
-                    idx_path.read_text()
-                )
+            if snapshot := open_canon(session.canon_path):
+                session.existing_canon = snapshot.ref()
+        self._remember(session)
         self._write(session)
         return session
 
     def get(self, session_id: str) -> Session | None:
-        p = self._path(session_id)
-        if not p.exists():
+        if session_id in self._cache:
+            self._cache.move_to_end(session_id)
+            return self._cache[session_id]
+        session = self.backend.load(session_id)
+        if session is None:
             return None
-        return Session.model_validate_json(p.read_text())
+        self._remember(session)
+        self._stored_stage[session.id] = session.stage
+        return session
 
     def update(self, session: Session) -> Session:
         session.updated_at = datetime.now(timezone.utc)
-        self._write(session)
+        self._remember(session)
+        if self._stored_stage.get(session.id) != session.stage:
+            self._write(session)
+        else:
+            self._dirty.add(session.id)
         return session
 
     def list_all(self) -> list[Session]:
-        return [
-            Session.model_validate_json(p.read_text())
-            for p in sorted(self._dir.glob("*.json"))
-        ]
+        self.flush()
+        return list(self.backend.iter_all())
+
+    def query(
+        self,
+        *,
+        stage: SessionStage | None = None,
+        name: str | None = None,
+        order_by: str = "updated_at",
+        descending: bool = True,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> SessionPage:
+        """Return one page of session summaries matching the filters."""
+        if order_by not in SORT_FIELDS:
+            raise ValueError(f"Cannot order sessions by {order_by!r}")
+        self.flush()
+        return self.backend.query(
+            stage=stage,
+            name=name,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+            offset=offset,
+        )
 
     def delete(self, session_id: str) -> bool:
-        p = self._path(session_id)
-        if p.exists():
-            p.unlink()
-            return True
-        return False
+        self._cache.pop(session_id, None)
+        self._dirty.discard(session_id)
+        self._stored_stage.pop(session_id, None)
+        return self.backend.delete(session_id)
+
+    # -- write-behind -------------------------------------------------------
+
+    def flush(self) -> None:
+        """Write every dirty session to the backend."""
+        for session_id in list(self._dirty):
+            if session := self._cache.get(session_id):
+                self._write(session)
+        self._dirty.clear()
+
+    def start(self, interval: float) -> None:
+        """Start the background flush task (call from a running loop)."""
+        async def _loop() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                self.flush()
+
+        self._flusher = asyncio.create_task(_loop())
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        self.flush()
 
     # -- helpers ------------------------------------------------------------
 
+    def _remember(self, session: Session) -> None:
+        self._cache[session.id] = session
+        self._cache.move_to_end(session.id)
+        # Evict least recently used clean sessions beyond the cache size.
+        for session_id in list(self._cache):
+            if len(self._cache) <= settings.session_cache_size:
+                break
+            if session_id not in self._dirty:
+                del self._cache[session_id]
+                self._stored_stage.pop(session_id, None)
+
     def _write(self, session: Session) -> None:
-        self._path(session.id).write_text(
-            session.model_dump_json(indent=2)
-        )
+        self.backend.save(session)
+        self._dirty.discard(session.id)
+        self._stored_stage[session.id] = session.stage
 
 
 store = SessionStore()
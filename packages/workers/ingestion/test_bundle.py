@@ -0,0 +1,48 @@
+"""Unpacking bundles, including ones whose index was tampered with."""
+
+import json
+
+import pytest
+
+from ingestion.bundle import BundleReader, export_bundle
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    canon = tmp_path / "canon"
+    canon.mkdir()
+    (canon / "a.md").write_text("# A\n")
+    entries = [{"id": "canon_0001", "filename": "a.md", "content_hash": "sha256:0"}]
+    (canon / "index.json").write_text(json.dumps({"entries": entries}))
+    export_bundle(canon, tmp_path / "bundle", compression="none")
+    return tmp_path / "bundle"
+
+
+def _rename(bundle, filename: str) -> None:
+    index = json.loads((bundle / "index.json").read_text())
+    index["entries"][0]["filename"] = filename
+    (bundle / "index.json").write_text(json.dumps(index))
+
+
+def test_unpack_round_trip(bundle, tmp_path):
+    with BundleReader(bundle) as reader:
+        assert reader.unpack(tmp_path / "out") == 1
+    assert (tmp_path / "out" / "a.md").read_text() == "# A\n"
+
+
+@pytest.mark.parametrize("filename", ["../escaped.md", "/tmp/escaped.md", "sub/a.md", "..", ""])
+def test_unpack_rejects_paths(bundle, tmp_path, filename):
+    _rename(bundle, filename)
+    with BundleReader(bundle) as reader, pytest.raises(ValueError):
+        reader.unpack(tmp_path / "out")
+    assert not (tmp_path / "escaped.md").exists()
+    assert list((tmp_path / "out").iterdir()) == []
+
+
+def test_unpack_does_not_follow_symlinks_out(bundle, tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "a.md").symlink_to(tmp_path / "escaped.md")
+    with BundleReader(bundle) as reader, pytest.raises(ValueError):
+        reader.unpack(out)
+    assert not (tmp_path / "escaped.md").exists()
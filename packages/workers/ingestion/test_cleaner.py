@@ -0,0 +1,17 @@
+"""Boilerplate stripping in clean_text with CRLF and NBSP input."""
+
+from ingestion.pipeline.cleaner import clean_text
+
+
+def test_crlf_lines_are_stripped():
+    text = "Intro\r\nShare this article\r\nBody\r\n[ menu ]\r\nEnd\r\n"
+    assert clean_text(text) == "Intro\nBody\nEnd"
+
+
+def test_nbsp_indented_lines_are_stripped():
+    text = "Intro\n\u00a0Subscribe to our newsletter\n\u00a0 footer \u00a0\nBody"
+    assert clean_text(text) == "Intro\nBody"
+
+
+def test_line_breaks_are_normalised():
+    assert clean_text("One\r\nTwo\rThree\u2028Four") == "One\nTwo\nThree\nFour"
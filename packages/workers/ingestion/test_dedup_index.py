@@ -0,0 +1,174 @@
+"""Shared dedup index claims, and their recovery after a crash.
+
+Separate ``DedupIndex`` instances stand in for separate processes: each
+holds its own file descriptors, so flocks between them conflict as they
+would across processes. Closing an index without releasing its claims
+stands in for a crash.
+"""
+
+import hashlib
+import json
+
+import pytest
+
+from ingestion.dedup_index import DedupIndex
+from ingestion.executor import _release_stale_claims
+from ingestion.journal import Journal, load_checkpoint
+from ingestion.pipeline.dedup import Deduplicator
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _entry(n: int, text: str, url: str) -> dict:
+    return {
+        "id": f"canon_{n:04d}",
+        "filename": f"{n}.md",
+        "content_hash": f"sha256:{_hash(text)}",
+        "source_url": url,
+    }
+
+
+@pytest.fixture
+def canon(tmp_path):
+    canon_dir = tmp_path / "canon"
+    canon_dir.mkdir()
+    entries = [_entry(1, "in the canon", "https://example.com/canon")]
+    (canon_dir / "index.json").write_text(json.dumps({"entries": entries}))
+    return canon_dir
+
+
+def _session(tmp_path, name: str, index: DedupIndex):
+    journal = Journal(tmp_path / f"{name}.jsonl")
+    dedup = Deduplicator(shared=index, on_claim=journal.record_claim)
+    output_dir = tmp_path / name
+    output_dir.mkdir()
+    return dedup, journal, output_dir
+
+
+def test_claim_release_and_reopen(canon):
+    a, b = DedupIndex(canon), DedupIndex(canon)
+    h = _hash("new text")
+    assert a.contains(content_hash=_hash("in the canon"))
+    assert not a.claim(content_hash=_hash("in the canon"), source_url="https://example.com/x")
+    assert not a.claim(content_hash=h, source_url="https://example.com/canon")
+
+    assert a.claim(content_hash=h, source_url="https://example.com/new")
+    assert not b.claim(content_hash=h, source_url="https://example.com/other")
+    assert b.is_claimed(content_hash=h) and b.contains_url("https://example.com/new")
+    assert not b.contains_url("https://example.com/new", claims=False)
+    assert a.claims == 2
+
+    a.release(content_hash=h, source_url="https://example.com/new")
+    assert not b.contains(content_hash=h, source_url="https://example.com/new")
+    assert a.claims == 0
+
+    # A release never removes the canon's own keys.
+    a.release(content_hash=_hash("in the canon"), source_url="https://example.com/canon")
+    assert b.contains(content_hash=_hash("in the canon"), source_url="https://example.com/canon")
+
+    a.close()
+    b.close()
+    reopened = DedupIndex(canon)
+    assert reopened.contains(content_hash=_hash("in the canon"))
+    assert not reopened.contains(content_hash=h)
+    reopened.close()
+
+
+def test_delete_keeps_colliding_keys_reachable(canon):
+    index = DedupIndex(canon)
+    hashes = [_hash(str(i)) for i in range(5000)]  # grows the table
+    for i, h in enumerate(hashes):
+        assert index.claim(content_hash=h, source_url=f"https://example.com/{i}")
+    for i, h in enumerate(hashes[::2]):
+        index.release(content_hash=h, source_url=f"https://example.com/{2 * i}")
+    other = DedupIndex(canon)
+    for i, h in enumerate(hashes):
+        assert other.contains(content_hash=h) == (i % 2 == 1)
+    assert other.claims == 5000
+    index.close()
+    other.close()
+
+
+def test_crashed_claims_dropped_once_no_process_has_index_open(canon):
+    crashed, live = DedupIndex(canon), DedupIndex(canon)
+    h = _hash("never written")
+    assert crashed.claim(content_hash=h, source_url="https://example.com/lost")
+    epoch = crashed.epoch
+    crashed.close()
+
+    # Another process still has the index open: claims may be its own.
+    again = DedupIndex(canon)
+    assert again.contains(content_hash=h)
+    again.close()
+
+    live.close()
+    fresh = DedupIndex(canon)
+    assert not fresh.contains(content_hash=h, source_url="https://example.com/lost")
+    assert fresh.claims == 0 and fresh.epoch != epoch
+    assert fresh.contains(content_hash=_hash("in the canon"))
+    fresh.close()
+
+
+def test_failed_claim_is_not_released_after_a_crash(canon, tmp_path):
+    index_a, index_b = DedupIndex(canon), DedupIndex(canon)
+    dedup_b, _, _ = _session(tmp_path, "b", index_b)
+    dedup_a, journal_a, output_a = _session(tmp_path, "a", index_a)
+    h = _hash("wanted by both")
+
+    assert dedup_b.claim(content_hash=h, source_url="https://example.com/b")
+    assert not dedup_a.claim(content_hash=h, source_url="https://example.com/a")
+    assert dedup_a.claimed_skips == 1
+    journal_a.close()  # A dies without releasing anything
+
+    recovered = load_checkpoint(journal_a.path)
+    assert h not in recovered.claims
+    rerun, journal, _ = _session(tmp_path, "a-rerun", index_a)
+    assert _release_stale_claims(rerun, recovered.claims, output_a, journal) == 0
+    assert index_b.contains(content_hash=h)
+    index_a.close()
+    index_b.close()
+
+
+def test_rerun_releases_unwritten_claims_and_holds_written_ones(canon, tmp_path):
+    index = DedupIndex(canon)
+    dedup, journal, output_dir = _session(tmp_path, "a", index)
+    written, lost = _hash("written"), _hash("lost")
+    assert dedup.claim(content_hash=written, source_url="https://example.com/w")
+    assert dedup.claim(content_hash=lost, source_url="https://example.com/l")
+    entry = _entry(1, "written", "https://example.com/w")
+    (output_dir / "index.jsonl").write_text(json.dumps(entry) + "\n")
+    journal.close()  # crash
+
+    recovered = load_checkpoint(journal.path)
+    rerun = Deduplicator(shared=index, on_claim=Journal(journal.path).record_claim)
+    rerun_journal = Journal(journal.path)
+    assert _release_stale_claims(rerun, recovered.claims, output_dir, rerun_journal) == 1
+    assert not index.contains(content_hash=lost, source_url="https://example.com/l")
+    assert index.contains(content_hash=written)
+
+    # The written claim is held until the rerun ends, and a second rerun
+    # does not release the lost one again.
+    assert rerun.release_claims() == [written]
+    assert not index.contains(content_hash=written)
+    rerun_journal.close()
+    assert lost not in load_checkpoint(journal.path).claims
+    index.close()
+
+
+def test_stale_release_spares_a_claim_made_after_a_rebuild(canon, tmp_path):
+    index = DedupIndex(canon)
+    dedup, journal, output_dir = _session(tmp_path, "a", index)
+    h = _hash("reclaimed")
+    assert dedup.claim(content_hash=h, source_url="https://example.com/a")
+    journal.close()
+    index.close()  # crash; the next open drops the claim
+
+    rebuilt = DedupIndex(canon)
+    assert rebuilt.claim(content_hash=h, source_url="https://example.com/b")
+    recovered = load_checkpoint(journal.path)
+    rerun, rerun_journal, _ = _session(tmp_path, "a-rerun", rebuilt)
+    assert _release_stale_claims(rerun, recovered.claims, output_dir, rerun_journal) == 1
+    assert rebuilt.contains(content_hash=h)
+    rebuilt.close()
@@ -3,12 +3,19 @@
 import os
 import re
 import sys
+from pathlib import Path
 from urllib.parse import urlparse
 
 import requests
 import trafilatura
 
+try:
+    from ingestion.http_cache import HTTPCache
+except ImportError:  # optional: conditional GETs when the ingestion worker is installed
+    HTTPCache = None
+
 OUTPUT_DIR = "docs/knowledge"
+CACHE_PATH = os.path.join(OUTPUT_DIR, ".http_cache.db")
 
 
 def sanitize_filename(url: str) -> str:
@@ -18,7 +25,7 @@ def sanitize_filename(url: str) -> str:
     return base or "document"
 
 
-def download_html(url: str) -> str:
+def download_html(url: str, headers: dict | None = None) -> requests.Response:
     resp = requests.get(
         url,
         timeout=20,
@@ -27,15 +34,31 @@ def download_html(url: str) -> str:
                 "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
                 "AppleWebKit/537.36 (KHTML, like Gecko) "
                 "Chrome/120.0 Safari/537.36"
-            )
+            ),
+            **(headers or {}),
         },
     )
     resp.raise_for_status()
-    return resp.text
+    return resp
 
 
 def fetch_and_save(url: str) -> None:
-    html = download_html(url)
+    filename = sanitize_filename(url) + ".md"
+    path = os.path.join(OUTPUT_DIR, filename)
+
+    # Revalidate instead of re-downloading when the page was saved before.
+    cache = HTTPCache(Path(CACHE_PATH)) if HTTPCache is not None else None
+    headers = {}
+    if cache is not None and os.path.exists(path):
+        entry = cache.get(url)
+        if entry is not None:
+            headers = entry.conditional_headers()
+
+    resp = download_html(url, headers)
+    if resp.status_code == 304:
+        print(f"Unchanged since last fetch: {path}")
+        return
+    html = resp.text
 
     text = trafilatura.extract(
         html,
@@ -50,12 +73,16 @@ def fetch_and_save(url: str) -> None:
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    filename = sanitize_filename(url) + ".md"
-    path = os.path.join(OUTPUT_DIR, filename)
-
     with open(path, "w", encoding="utf-8") as f:
         f.write(text)
 
+    if cache is not None:
+        cache.store(
+            url,
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+        )
+
     print(f"Saved content to {path}")
 
 